@@ -1,6 +1,72 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+import re
+import time
+import weakref
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import anthropic
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Turn boundaries in SessionManager's "User: ..." / "Assistant: ..." history
+TURN_BOUNDARY = re.compile(r"\n(?=(?:User|Assistant): )")
+
+TOOL_CHOICE_AUTO = {"type": "auto"}
+
+# Tools are listed but never called, for requests that can't run them
+TOOL_CHOICE_NONE = {"type": "none"}
+
+# Keep-alive pool shared by every request made through one client
+POOL_LIMITS = httpx.Limits(
+    max_keepalive_connections=32, max_connections=64, keepalive_expiry=60.0
+)
+
+
+def _request_timeout(read_timeout: float) -> httpx.Timeout:
+    """Build per-request timeouts; read_timeout bounds waiting on Claude"""
+    return httpx.Timeout(connect=5.0, read=read_timeout, write=10.0, pool=5.0)
+
+
+@lru_cache(maxsize=None)
+def _get_client(
+    api_key: str, request_timeout: float = 30.0, max_retries: int = 2
+) -> anthropic.Anthropic:
+    """Return a shared client per API key so keep-alive connections are reused"""
+    # The SDK retries timeouts and connection errors with jittered backoff
+    return anthropic.Anthropic(
+        api_key=api_key,
+        timeout=_request_timeout(request_timeout),
+        max_retries=max_retries,
+        http_client=anthropic.DefaultHttpxClient(limits=POOL_LIMITS),
+    )
+
+
+# Async connections belong to the loop that opened them, so clients are per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_async_client(
+    api_key: str, request_timeout: float = 30.0, max_retries: int = 2
+) -> anthropic.AsyncAnthropic:
+    """Return a shared async client per API key for the running event loop"""
+    clients: Dict[Tuple[str, float, int], anthropic.AsyncAnthropic] = (
+        _async_clients.setdefault(asyncio.get_running_loop(), {})
+    )
+    key = (api_key, request_timeout, max_retries)
+    if key not in clients:
+        clients[key] = anthropic.AsyncAnthropic(
+            api_key=api_key,
+            timeout=_request_timeout(request_timeout),
+            max_retries=max_retries,
+            http_client=anthropic.DefaultAsyncHttpxClient(limits=POOL_LIMITS),
+        )
+    return clients[key]
 
 
 class AIGenerator:
@@ -43,12 +109,62 @@ All responses must be:
 Provide only the direct answer to what was asked.
 """
 
-    def __init__(self, api_key: str, model: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    # Marks a content block as a cacheable prompt prefix
+    CACHE_CONTROL = {"type": "ephemeral"}
+
+    # Static system block, cached so follow-up rounds reuse the processed prefix
+    SYSTEM_BLOCK = {
+        "type": "text",
+        "text": SYSTEM_PROMPT,
+        "cache_control": CACHE_CONTROL,
+    }
+
+    # The first tool round mostly emits short tool_use blocks; answers get 800
+    TOOL_ROUND_MAX_TOKENS = 256
+
+    # Upper bound on conversation history sent with each request
+    MAX_HISTORY_CHARS = 4000
+
+    # Shortest text alongside tool calls that counts as a complete answer
+    EARLY_ANSWER_MIN_CHARS = 200
+
+    # How the course tools report that nothing matched
+    EMPTY_RESULT_PREFIXES = ("No relevant content found", "No course found matching")
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        request_timeout: float = 30.0,
+        max_retries: int = 2,
+        skip_round2_when_text_present: bool = False,
+    ):
+        self.client = _get_client(api_key, request_timeout, max_retries)
+        self._client_settings = (api_key, request_timeout, max_retries)
+        # A pinned async client; None uses the shared one for the running loop
+        self._async_client: Optional[anthropic.AsyncAnthropic] = None
         self.model = model
+        self.skip_round2_when_text_present = skip_round2_when_text_present
 
         # Pre-build base API parameters
         self.base_params = {"model": self.model, "temperature": 0, "max_tokens": 800}
+        self.tool_round_params = {**self.base_params, "tool_choice": TOOL_CHOICE_AUTO}
+        # Later rounds often carry the answer itself, so only round 1 is capped
+        self.first_round_params = {
+            **self.tool_round_params,
+            "max_tokens": self.TOOL_ROUND_MAX_TOKENS,
+        }
+
+    @property
+    def async_client(self) -> anthropic.AsyncAnthropic:
+        """Async client usable from the running event loop"""
+        if self._async_client is not None:
+            return self._async_client
+        return _get_async_client(*self._client_settings)
+
+    @async_client.setter
+    def async_client(self, client: anthropic.AsyncAnthropic) -> None:
+        self._async_client = client
 
     def generate_response(
         self,
@@ -70,33 +186,27 @@ Provide only the direct answer to what was asked.
         Returns:
             Generated response as string
         """
-
-        # Build system content efficiently - avoid string ops when possible
-        system_content = (
-            f"{self.SYSTEM_PROMPT}\n\nPrevious conversation:\n{conversation_history}"
-            if conversation_history
-            else self.SYSTEM_PROMPT
-        )
+        system_content, tools = self._prepare_prompt(conversation_history, tools)
 
         # Start with initial messages
         messages = [{"role": "user", "content": query}]
 
         # Execute up to 2 rounds of tool calling
         for round_num in range(2):
-            # Prepare API call parameters
-            api_params = {
-                **self.base_params,
-                "messages": messages,
-                "system": system_content,
-            }
-
-            # Add tools if available
-            if tools:
-                api_params["tools"] = tools
-                api_params["tool_choice"] = {"type": "auto"}
-
             # Get response from Claude
-            response = self.client.messages.create(**api_params)
+            started = time.perf_counter()
+            response = self._create_message(
+                self.client, messages, system_content, tools, round_num == 0
+            )
+            self._log_llm_call(round_num + 1, started, response)
+
+            if self._hit_first_round_cap(response, round_num, tools):
+                # Redo the round in full, keeping the tools so searches still run
+                started = time.perf_counter()
+                response = self._create_message(
+                    self.client, messages, system_content, tools
+                )
+                self._log_llm_call(round_num + 1, started, response)
 
             # Handle tool execution if needed
             if response.stop_reason == "tool_use" and tool_manager:
@@ -105,20 +215,352 @@ Provide only the direct answer to what was asked.
                 )
                 if not should_continue:
                     break
+
+                # Skip the next round if the text already answered the question
+                early_answer = self._early_answer(response, messages)
+                if early_answer:
+                    return early_answer
             else:
                 # No tool use, return direct response
                 return response.content[0].text
 
         # After max rounds, make final call without tools to get response
-        final_params = {
-            **self.base_params,
-            "messages": messages,
-            "system": system_content,
-        }
+        started = time.perf_counter()
+        final_response = self._create_message(self.client, messages, system_content)
+        self._log_llm_call("final", started, final_response)
+        return final_response.content[0].text
+
+    async def generate_response_async(
+        self,
+        query: str,
+        conversation_history: Optional[str] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+    ) -> str:
+        """
+        Async variant of generate_response for use inside the event loop.
+        Tool calls requested in the same round are executed concurrently.
 
-        final_response = self.client.messages.create(**final_params)
+        Args:
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+
+        Returns:
+            Generated response as string
+        """
+        system_content, tools = self._prepare_prompt(conversation_history, tools)
+
+        messages = [{"role": "user", "content": query}]
+
+        answer = await self._run_tool_rounds_async(
+            messages, system_content, tools, tool_manager
+        )
+        if answer is not None:
+            return answer
+
+        started = time.perf_counter()
+        final_response = await self._create_message(
+            self.async_client, messages, system_content
+        )
+        self._log_llm_call("final", started, final_response)
         return final_response.content[0].text
 
+    async def generate_response_stream(
+        self,
+        query: str,
+        conversation_history: Optional[str] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of generate_response_async.
+        Tool rounds run to completion; the answer that follows tool calls is
+        streamed as it is generated. An answer Claude gives directly in a tool
+        round arrives as a single chunk.
+
+        Args:
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+
+        Yields:
+            Chunks of the generated response text
+        """
+        system_content, tools = self._prepare_prompt(conversation_history, tools)
+
+        messages = [{"role": "user", "content": query}]
+
+        # Tool rounds need the complete content and stop_reason, so don't stream
+        if tools:
+            answer = await self._run_tool_rounds_async(
+                messages, system_content, tools, tool_manager
+            )
+            if answer is not None:
+                yield answer
+                return
+
+        async with self.async_client.messages.stream(
+            **self.base_params, messages=messages, system=system_content
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+    async def _run_tool_rounds_async(
+        self,
+        messages: List,
+        system_content: List[Dict[str, Any]],
+        tools: Optional[List],
+        tool_manager,
+    ) -> Optional[str]:
+        """
+        Run up to 2 rounds of tool calling, extending messages in place.
+
+        Returns:
+            Claude's direct answer, or None if a final call is still needed
+        """
+        for round_num in range(2):
+            started = time.perf_counter()
+            response = await self._create_message(
+                self.async_client, messages, system_content, tools, round_num == 0
+            )
+            self._log_llm_call(round_num + 1, started, response)
+
+            if self._hit_first_round_cap(response, round_num, tools):
+                started = time.perf_counter()
+                response = await self._create_message(
+                    self.async_client, messages, system_content, tools
+                )
+                self._log_llm_call(round_num + 1, started, response)
+
+            if response.stop_reason == "tool_use" and tool_manager:
+                messages, should_continue = await self._handle_tool_execution_async(
+                    response, messages, tool_manager
+                )
+                if not should_continue:
+                    break
+
+                early_answer = self._early_answer(response, messages)
+                if early_answer:
+                    return early_answer
+            else:
+                return response.content[0].text
+
+        return None
+
+    def generate_batch(
+        self,
+        queries: List[str],
+        tools: Optional[List] = None,
+        poll_interval: float = 30.0,
+        max_wait: float = 3600.0,
+    ) -> Dict[str, Optional[str]]:
+        """
+        Answer independent queries through the Message Batches API.
+        Batches are billed at a discount but can take minutes to finish, so
+        this is meant for offline evaluation rather than interactive use.
+        Tools are sent so the prompt matches live queries, but batched
+        requests can't run them, so Claude answers without calling them.
+
+        Args:
+            queries: Questions to answer
+            tools: Tool definitions offered to live queries
+            poll_interval: Seconds to wait between batch status checks
+            max_wait: Seconds to wait for the batch before giving up
+
+        Returns:
+            Mapping of custom_id ("q-<index>") to response text, or None for
+            requests that did not succeed
+
+        Raises:
+            TimeoutError: If the batch hasn't ended within max_wait seconds
+        """
+        system_content, tools = self._prepare_prompt(None, tools)
+        params = {**self.base_params, "system": system_content}
+        if tools:
+            params.update(tools=tools, tool_choice=TOOL_CHOICE_NONE)
+
+        requests = [
+            {
+                "custom_id": f"q-{i}",
+                "params": {
+                    **params,
+                    "messages": [{"role": "user", "content": query}],
+                },
+            }
+            for i, query in enumerate(queries)
+        ]
+
+        batch = self.client.messages.batches.create(requests=requests)
+        deadline = time.monotonic() + max_wait
+        while batch.processing_status != "ended":
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Batch {batch.id} did not finish within {max_wait} seconds"
+                )
+            time.sleep(poll_interval)
+            batch = self.client.messages.batches.retrieve(batch.id)
+
+        results: Dict[str, Optional[str]] = {}
+        for entry in self.client.messages.batches.results(batch.id):
+            if entry.result.type == "succeeded":
+                results[entry.custom_id] = entry.result.message.content[0].text
+            else:
+                # errored, canceled or expired
+                results[entry.custom_id] = None
+        return results
+
+    def _create_message(
+        self,
+        client,
+        messages: List,
+        system_content: List[Dict[str, Any]],
+        tools: Optional[List] = None,
+        first_round: bool = False,
+    ):
+        """
+        Call messages.create with the pre-built params passed straight through
+        as keyword arguments. With the async client this returns an awaitable.
+        """
+        if tools:
+            params = self.first_round_params if first_round else self.tool_round_params
+            return client.messages.create(
+                **params,
+                tools=tools,
+                messages=messages,
+                system=system_content,
+            )
+        return client.messages.create(
+            **self.base_params, messages=messages, system=system_content
+        )
+
+    @staticmethod
+    def _hit_first_round_cap(
+        response: Any, round_num: int, tools: Optional[List]
+    ) -> bool:
+        """Whether round 1 was cut off by TOOL_ROUND_MAX_TOKENS"""
+        return bool(tools) and round_num == 0 and response.stop_reason == "max_tokens"
+
+    def _prepare_prompt(
+        self, conversation_history: Optional[str], tools: Optional[List]
+    ) -> Tuple[List[Dict[str, Any]], Optional[List]]:
+        """Build the system blocks and cache-marked tool list for a request"""
+        # Keep the cached static prompt first so history doesn't break the prefix
+        system_content = [self.SYSTEM_BLOCK]
+        if conversation_history:
+            system_content.append(
+                {
+                    "type": "text",
+                    "text": self._history_text(
+                        conversation_history, self.MAX_HISTORY_CHARS
+                    ),
+                }
+            )
+
+        # Cache breakpoint on the last tool covers the whole tool schema
+        if tools:
+            tools = [*tools[:-1], {**tools[-1], "cache_control": self.CACHE_CONTROL}]
+
+        return system_content, tools
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _history_text(history: str, max_chars: int) -> str:
+        """Trim and label history once; repeat turns reuse the built string"""
+        trimmed = AIGenerator._trim_history(history, max_chars)
+        return f"Previous conversation:\n{trimmed}"
+
+    @staticmethod
+    def _trim_history(history: str, max_chars: int) -> str:
+        """Keep the most recent whole turns of history that fit in max_chars"""
+        if len(history) <= max_chars:
+            return history
+
+        kept: List[str] = []
+        remaining = max_chars
+        for turn in reversed(TURN_BOUNDARY.split(history)):
+            if len(turn) > remaining:
+                break
+            kept.append(turn)
+            remaining -= len(turn) + 1
+
+        if not kept:
+            # The latest turn alone is over budget, keep its tail
+            return history[-max_chars:]
+        return "\n".join(reversed(kept))
+
+    def _early_answer(self, response, messages: List) -> Optional[str]:
+        """
+        Return text Claude wrote alongside its tool calls when it already
+        stands as an answer and every tool call came back empty.
+        """
+        if not self.skip_round2_when_text_present:
+            return None
+
+        text = "".join(
+            block.text for block in response.content if block.type == "text"
+        ).strip()
+        if len(text) < self.EARLY_ANSWER_MIN_CHARS:
+            return None
+
+        # Text written before the tools ran can't have used what they found,
+        # so only empty results qualify; they carry no sources to attach
+        tool_results = messages[-1]["content"]
+        if all(self._is_empty_result(result["content"]) for result in tool_results):
+            return text
+        return None
+
+    def _is_empty_result(self, content: str) -> bool:
+        """Whether a tool result is blank or a no-match message"""
+        content = content.strip()
+        return not content or content.startswith(self.EMPTY_RESULT_PREFIXES)
+
+    @staticmethod
+    def _log_llm_call(round_label, started: float, response) -> None:
+        """Log latency and token usage for one messages.create call"""
+        usage = getattr(response, "usage", None)
+        logger.info(
+            {
+                "event": "llm_call",
+                "round": round_label,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+                "input_tokens": getattr(usage, "input_tokens", None),
+                "output_tokens": getattr(usage, "output_tokens", None),
+                "stop_reason": getattr(response, "stop_reason", None),
+            }
+        )
+
+    @staticmethod
+    def _tool_call_key(content_block) -> Tuple[str, str]:
+        """Identify a tool call by its name and canonical input"""
+        return (
+            content_block.name,
+            json.dumps(content_block.input, sort_keys=True, separators=(",", ":")),
+        )
+
+    @staticmethod
+    def _execute_tool(tool_manager, content_block) -> str:
+        """Run one requested tool, logging how long it took"""
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = tool_manager.execute_tool(
+                content_block.name, **content_block.input
+            )
+            status = "ok"
+            return result
+        finally:
+            logger.info(
+                {
+                    "event": "tool_call",
+                    "tool": content_block.name,
+                    "status": status,
+                    "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+                }
+            )
+
     def _handle_tool_execution(self, initial_response, messages: List, tool_manager):
         """
         Handle execution of tool calls and update message history.
@@ -134,39 +576,93 @@ Provide only the direct answer to what was asked.
         # Add AI's tool use response
         messages.append({"role": "assistant", "content": initial_response.content})
 
-        # Execute all tool calls and collect results
+        # Execute each distinct call once, keeping failures to report back
+        tool_blocks, unique_calls = self._unique_tool_calls(initial_response)
+        outcome_by_call: Dict[Tuple[str, str], Any] = {}
+        for call_key, content_block in unique_calls.items():
+            try:
+                outcome_by_call[call_key] = self._execute_tool(
+                    tool_manager, content_block
+                )
+            except Exception as e:
+                outcome_by_call[call_key] = e
+
+        should_continue = self._add_tool_results(tool_blocks, outcome_by_call, messages)
+        return messages, should_continue
+
+    async def _handle_tool_execution_async(
+        self, initial_response, messages: List, tool_manager
+    ):
+        """
+        Execute all tool calls from one response concurrently.
+
+        Args:
+            initial_response: The response containing tool use requests
+            messages: Current message history
+            tool_manager: Manager to execute tools
+
+        Returns:
+            Tuple of (updated_messages, should_continue)
+        """
+        messages.append({"role": "assistant", "content": initial_response.content})
+
+        tool_blocks, unique_calls = self._unique_tool_calls(initial_response)
+
+        # Tools do blocking I/O; gather keeps results in request order
+        outcomes = await asyncio.gather(
+            *(
+                asyncio.to_thread(self._execute_tool, tool_manager, block)
+                for block in unique_calls.values()
+            ),
+            return_exceptions=True,
+        )
+        outcome_by_call = dict(zip(unique_calls, outcomes))
+
+        should_continue = self._add_tool_results(tool_blocks, outcome_by_call, messages)
+        return messages, should_continue
+
+    def _unique_tool_calls(
+        self, response: Any
+    ) -> Tuple[List[Any], Dict[Tuple[str, str], Any]]:
+        """Return a response's tool_use blocks and the distinct calls among them"""
+        tool_blocks = [block for block in response.content if block.type == "tool_use"]
+
+        # Identical calls in one round are executed once
+        unique_calls: Dict[Tuple[str, str], Any] = {}
+        for block in tool_blocks:
+            unique_calls.setdefault(self._tool_call_key(block), block)
+        return tool_blocks, unique_calls
+
+    def _add_tool_results(
+        self,
+        tool_blocks: List[Any],
+        outcome_by_call: Dict[Tuple[str, str], Any],
+        messages: List,
+    ) -> bool:
+        """
+        Append one tool_result per tool_use block to messages.
+
+        Returns:
+            False if any call raised, so no further rounds should run
+        """
         tool_results = []
-        for content_block in initial_response.content:
-            if content_block.type == "tool_use":
-                try:
-                    tool_result = tool_manager.execute_tool(
-                        content_block.name, **content_block.input
-                    )
-
-                    tool_results.append(
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": content_block.id,
-                            "content": tool_result,
-                        }
-                    )
-                except Exception as e:
-                    # Tool execution failed, stop rounds
-                    tool_results.append(
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": content_block.id,
-                            "content": f"Error: Tool execution failed - {str(e)}",
-                        }
-                    )
-                    # Add tool results and signal to stop
-                    if tool_results:
-                        messages.append({"role": "user", "content": tool_results})
-                    return messages, False
-
-        # Add tool results as single message
+        should_continue = True
+        for content_block in tool_blocks:
+            outcome = outcome_by_call[self._tool_call_key(content_block)]
+            if isinstance(outcome, Exception):
+                # Tool execution failed, stop rounds after reporting it
+                outcome = f"Error: Tool execution failed - {str(outcome)}"
+                should_continue = False
+
+            tool_results.append(
+                {
+                    "type": "tool_result",
+                    "tool_use_id": content_block.id,
+                    "content": outcome,
+                }
+            )
+
         if tool_results:
             messages.append({"role": "user", "content": tool_results})
 
-        # Continue with next round
-        return messages, True
+        return should_continue
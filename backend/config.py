@@ -14,6 +14,10 @@ class Config:
     # Anthropic API settings
     ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
     ANTHROPIC_MODEL: str = "claude-sonnet-4-20250514"
+    REQUEST_TIMEOUT: float = 30.0  # Seconds to wait on a Claude response
+    MAX_RETRIES: int = 2  # Retries on API timeouts and connection errors
+    # Answer from text sent alongside tool calls when tools add nothing new
+    SKIP_ROUND2_WHEN_TEXT_PRESENT: bool = False
 
     # Embedding model settings
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
@@ -24,6 +28,10 @@ class Config:
     MAX_RESULTS: int = 5  # Maximum search results to return
     MAX_HISTORY: int = 2  # Number of conversation messages to remember
 
+    # Response cache settings
+    RESPONSE_CACHE_SIZE: int = 1024  # Repeat queries answered without the LLM
+    RESPONSE_CACHE_TTL: float = 600.0  # Seconds before a cached answer expires
+
     # Database paths
     CHROMA_PATH: str = "./chroma_db"  # ChromaDB storage location
 
@@ -1,10 +1,16 @@
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from ai_generator import AIGenerator
 from document_processor import DocumentProcessor
 from models import Course, CourseChunk, Lesson
-from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
+from response_cache import ResponseCache
+from search_tools import (
+    CourseOutlineTool,
+    CourseSearchTool,
+    RequestToolManager,
+    ToolManager,
+)
 from session_manager import SessionManager
 from vector_store import VectorStore
 
@@ -23,9 +29,16 @@ class RAGSystem:
             config.CHROMA_PATH, config.EMBEDDING_MODEL, config.MAX_RESULTS
         )
         self.ai_generator = AIGenerator(
-            config.ANTHROPIC_API_KEY, config.ANTHROPIC_MODEL
+            config.ANTHROPIC_API_KEY,
+            config.ANTHROPIC_MODEL,
+            config.REQUEST_TIMEOUT,
+            config.MAX_RETRIES,
+            config.SKIP_ROUND2_WHEN_TEXT_PRESENT,
         )
         self.session_manager = SessionManager(config.MAX_HISTORY)
+        self.response_cache = ResponseCache(
+            config.RESPONSE_CACHE_SIZE, config.RESPONSE_CACHE_TTL
+        )
 
         # Initialize search tools
         self.tool_manager = ToolManager()
@@ -56,6 +69,9 @@ class RAGSystem:
             # Add course content chunks to vector store
             self.vector_store.add_course_content(course_chunks)
 
+            # Cached answers may be stale now that the catalog changed
+            self.response_cache.clear()
+
             return course, len(course_chunks)
         except Exception as e:
             print(f"Error processing course document {file_path}: {e}")
@@ -81,6 +97,7 @@ class RAGSystem:
         if clear_existing:
             print("Clearing existing data for fresh rebuild...")
             self.vector_store.clear_all_data()
+            self.response_cache.clear()
 
         if not os.path.exists(folder_path):
             print(f"Folder {folder_path} does not exist")
@@ -117,11 +134,14 @@ class RAGSystem:
                 except Exception as e:
                     print(f"Error processing {file_name}: {e}")
 
+        if total_courses:
+            self.response_cache.clear()
+
         return total_courses, total_chunks
 
     def query(
         self, query: str, session_id: Optional[str] = None
-    ) -> Tuple[str, List[str], List[str]]:
+    ) -> Tuple[str, List[str], List[Optional[str]]]:
         """
         Process a user query using the RAG system with tool-based search.
 
@@ -132,6 +152,117 @@ class RAGSystem:
         Returns:
             Tuple of (response, sources list, source_links list)
         """
+        prompt, history = self._prepare_query(query, session_id)
+
+        cache_key = self.response_cache.make_key(query, history)
+        cached = self._cached_answer(cache_key, query, session_id)
+        if cached:
+            return cached
+
+        # Generate response using AI with tools; sources stay with this request
+        tool_manager = self.tool_manager.for_request()
+        response = self.ai_generator.generate_response(
+            query=prompt,
+            conversation_history=history,
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        return self._finish_query(query, session_id, response, tool_manager, cache_key)
+
+    async def query_async(
+        self, query: str, session_id: Optional[str] = None
+    ) -> Tuple[str, List[str], List[Optional[str]]]:
+        """
+        Async variant of query that doesn't block the event loop while the
+        AI generator and its tools run.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Returns:
+            Tuple of (response, sources list, source_links list)
+        """
+        prompt, history = self._prepare_query(query, session_id)
+
+        cache_key = self.response_cache.make_key(query, history)
+        cached = self._cached_answer(cache_key, query, session_id)
+        if cached:
+            return cached
+
+        tool_manager = self.tool_manager.for_request()
+        response = await self.ai_generator.generate_response_async(
+            query=prompt,
+            conversation_history=history,
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        return self._finish_query(query, session_id, response, tool_manager, cache_key)
+
+    async def query_stream(
+        self, query: str, session_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the response to a user query as it is generated.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Yields:
+            {"type": "text", "text": ...} events for each response chunk,
+            then one {"type": "done", "sources": ..., "source_links": ...}
+        """
+        prompt, history = self._prepare_query(query, session_id)
+
+        cache_key = self.response_cache.make_key(query, history)
+        cached = self._cached_answer(cache_key, query, session_id)
+        if cached:
+            response, sources, source_links = cached
+            yield {"type": "text", "text": response}
+            yield {"type": "done", "sources": sources, "source_links": source_links}
+            return
+
+        chunks = []
+        tool_manager = self.tool_manager.for_request()
+        async for text in self.ai_generator.generate_response_stream(
+            query=prompt,
+            conversation_history=history,
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        ):
+            chunks.append(text)
+            yield {"type": "text", "text": text}
+
+        _, sources, source_links = self._finish_query(
+            query, session_id, "".join(chunks), tool_manager, cache_key
+        )
+        yield {"type": "done", "sources": sources, "source_links": source_links}
+
+    def query_batch(self, queries: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Answer independent queries through the Message Batches API, using the
+        same prompt and tool definitions as live queries. Sessions, sources
+        and the response cache are not involved.
+
+        Args:
+            queries: User questions
+
+        Returns:
+            Mapping of custom_id ("q-<index>") to response text, or None for
+            requests that did not succeed
+        """
+        prompts = [self._prepare_query(query, None)[0] for query in queries]
+        return self.ai_generator.generate_batch(
+            prompts, tools=self.tool_manager.get_tool_definitions()
+        )
+
+    def _prepare_query(
+        self, query: str, session_id: Optional[str]
+    ) -> Tuple[str, Optional[str]]:
+        """Build the AI prompt and look up conversation history for a query"""
         # Create prompt for the AI with clear instructions
         prompt = f"""Answer this question about course materials: {query}"""
 
@@ -140,25 +271,38 @@ class RAGSystem:
         if session_id:
             history = self.session_manager.get_conversation_history(session_id)
 
-        # Generate response using AI with tools
-        response = self.ai_generator.generate_response(
-            query=prompt,
-            conversation_history=history,
-            tools=self.tool_manager.get_tool_definitions(),
-            tool_manager=self.tool_manager,
-        )
+        return prompt, history
 
-        # Get sources and source links from the search tool
-        sources = self.tool_manager.get_last_sources()
-        source_links = self.tool_manager.get_last_source_links()
+    def _cached_answer(
+        self, cache_key: bytes, query: str, session_id: Optional[str]
+    ) -> Optional[Tuple[str, List[str], List[Optional[str]]]]:
+        """Return a cached answer for a repeat query, recording the exchange"""
+        cached = self.response_cache.get(cache_key)
+        if cached and session_id:
+            self.session_manager.add_exchange(session_id, query, cached[0])
+        return cached
 
-        # Reset sources after retrieving them
-        self.tool_manager.reset_sources()
+    def _finish_query(
+        self,
+        query: str,
+        session_id: Optional[str],
+        response: str,
+        tool_manager: RequestToolManager,
+        cache_key: Optional[bytes] = None,
+    ) -> Tuple[str, List[str], List[Optional[str]]]:
+        """Collect sources and record the exchange once a response is generated"""
+        # Sources come from this request's tool calls only
+        sources = tool_manager.sources
+        source_links = tool_manager.source_links
 
         # Update conversation history
         if session_id:
             self.session_manager.add_exchange(session_id, query, response)
 
+        # Answers written around a failed tool call shouldn't outlive the failure
+        if cache_key is not None and not tool_manager.failed:
+            self.response_cache.set(cache_key, (response, sources, source_links))
+
         # Return response with sources and links from tool searches
         return response, sources, source_links
 
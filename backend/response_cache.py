@@ -0,0 +1,54 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+# (response, sources, source_links) as returned by RAGSystem.query
+CachedAnswer = Tuple[str, List[str], List[Optional[str]]]
+
+
+class ResponseCache:
+    """Bounded LRU of recent answers so exact repeat queries skip the LLM"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, Tuple[float, CachedAnswer]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(query: str, conversation_history: Optional[str] = None) -> bytes:
+        """Hash the normalized query together with the history it was asked in"""
+        normalized = " ".join(query.lower().split())
+        payload = f"{normalized}\x00{conversation_history or ''}"
+        return hashlib.blake2b(payload.encode(), digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[CachedAnswer]:
+        """Return the cached answer for key, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        stored_at, answer = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return answer
+
+    def set(self, key: bytes, answer: CachedAnswer) -> None:
+        """Store an answer, evicting the least recently used entry when full"""
+        if self.max_size <= 0:
+            return
+
+        self._entries[key] = (time.monotonic(), answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached answer, e.g. after the course catalog changes"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
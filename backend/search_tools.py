@@ -1,9 +1,20 @@
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, Protocol
+from typing import Any, Dict, List, NamedTuple, Optional, Protocol
 
 from vector_store import SearchResults, VectorStore
 
 
+class ToolResult(NamedTuple):
+    """Output of one tool call, with the sources it drew on"""
+
+    text: str
+    sources: List[str]
+    source_links: List[Optional[str]]
+    # Set when the call hit an error rather than producing a real answer
+    failed: bool = False
+
+
 class Tool(ABC):
     """Abstract base class for all tools"""
 
@@ -17,6 +28,10 @@ class Tool(ABC):
         """Execute the tool with given parameters"""
         pass
 
+    def execute_with_sources(self, **kwargs) -> ToolResult:
+        """Execute the tool and return its result with the sources it used"""
+        return ToolResult(self.execute(**kwargs), [], [])
+
 
 class CourseSearchTool(Tool):
     """Tool for searching course content with semantic course name matching"""
@@ -68,7 +83,24 @@ class CourseSearchTool(Tool):
         Returns:
             Formatted search results or error message
         """
+        result = self.execute_with_sources(query, course_name, lesson_number)
+        self.last_sources = result.sources
+        self.last_source_links = result.source_links
+        return result.text
+
+    def execute_with_sources(
+        self,
+        query: str,
+        course_name: Optional[str] = None,
+        lesson_number: Optional[int] = None,
+    ) -> ToolResult:
+        """
+        Search without touching shared state, returning the sources found.
 
+        Returns:
+            ToolResult with formatted results or error message, flagged as
+            failed when the search itself errored
+        """
         # Use the vector store's unified search interface
         results = self.store.search(
             query=query, course_name=course_name, lesson_number=lesson_number
@@ -76,7 +108,7 @@ class CourseSearchTool(Tool):
 
         # Handle errors
         if results.error:
-            return results.error
+            return ToolResult(results.error, [], [], failed=True)
 
         # Handle empty results
         if results.is_empty():
@@ -85,12 +117,12 @@ class CourseSearchTool(Tool):
                 filter_info += f" in course '{course_name}'"
             if lesson_number:
                 filter_info += f" in lesson {lesson_number}"
-            return f"No relevant content found{filter_info}."
+            return ToolResult(f"No relevant content found{filter_info}.", [], [])
 
         # Format and return results
         return self._format_results(results)
 
-    def _format_results(self, results: SearchResults) -> str:
+    def _format_results(self, results: SearchResults) -> ToolResult:
         """Format search results with course and lesson context"""
         formatted = []
         sources = []  # Track sources for the UI
@@ -120,16 +152,15 @@ class CourseSearchTool(Tool):
 
             formatted.append(f"{header}\n{doc}")
 
-        # Store sources and links for retrieval
-        self.last_sources = sources
-        self.last_source_links = source_links
-
-        return "\n\n".join(formatted)
+        return ToolResult("\n\n".join(formatted), sources, source_links)
 
 
 class CourseOutlineTool(Tool):
     """Tool for getting course outline and lesson structure"""
 
+    # Prefix of the message returned when the catalog lookup fails
+    ERROR_PREFIX = "Error retrieving course outline"
+
     def __init__(self, vector_store: VectorStore):
         self.store = vector_store
 
@@ -197,7 +228,12 @@ class CourseOutlineTool(Tool):
             return "\n".join(outline)
 
         except Exception as e:
-            return f"Error retrieving course outline: {str(e)}"
+            return f"{self.ERROR_PREFIX}: {str(e)}"
+
+    def execute_with_sources(self, course_name: str) -> ToolResult:
+        """Get the course outline, flagging failed catalog lookups"""
+        result = self.execute(course_name)
+        return ToolResult(result, [], [], failed=result.startswith(self.ERROR_PREFIX))
 
 
 class ToolManager:
@@ -205,6 +241,7 @@ class ToolManager:
 
     def __init__(self):
         self.tools = {}
+        self._tool_definitions = None
 
     def register_tool(self, tool: Tool):
         """Register any tool that implements the Tool interface"""
@@ -213,10 +250,16 @@ class ToolManager:
         if not tool_name:
             raise ValueError("Tool must have a 'name' in its definition")
         self.tools[tool_name] = tool
+        self._tool_definitions = None
 
     def get_tool_definitions(self) -> list:
         """Get all tool definitions for Anthropic tool calling"""
-        return [tool.get_tool_definition() for tool in self.tools.values()]
+        # Definitions are static, so build them once per set of tools
+        if self._tool_definitions is None:
+            self._tool_definitions = [
+                tool.get_tool_definition() for tool in self.tools.values()
+            ]
+        return self._tool_definitions
 
     def execute_tool(self, tool_name: str, **kwargs) -> str:
         """Execute a tool by name with given parameters"""
@@ -225,6 +268,17 @@ class ToolManager:
 
         return self.tools[tool_name].execute(**kwargs)
 
+    def execute_tool_with_sources(self, tool_name: str, **kwargs) -> ToolResult:
+        """Execute a tool by name, returning its result with the sources it used"""
+        if tool_name not in self.tools:
+            return ToolResult(f"Tool '{tool_name}' not found", [], [], failed=True)
+
+        return self.tools[tool_name].execute_with_sources(**kwargs)
+
+    def for_request(self) -> "RequestToolManager":
+        """Return a view of these tools that keeps one request's sources"""
+        return RequestToolManager(self)
+
     def get_last_sources(self) -> list:
         """Get sources from the last search operation"""
         # Check all tools for last_sources attribute
@@ -248,3 +302,37 @@ class ToolManager:
                 tool.last_sources = []
             if hasattr(tool, "last_source_links"):
                 tool.last_source_links = []
+
+
+class RequestToolManager:
+    """
+    Tool manager for a single request. Sources are collected from each tool
+    call it makes, so concurrent requests never see each other's sources.
+    """
+
+    def __init__(self, tool_manager: ToolManager):
+        self.tool_manager = tool_manager
+        self.sources: List[str] = []
+        self.source_links: List[Optional[str]] = []
+        # Whether any tool call raised or reported an error
+        self.failed = False
+        # Tools requested in the same round run on worker threads
+        self._lock = threading.Lock()
+
+    def get_tool_definitions(self) -> list:
+        """Get all tool definitions for Anthropic tool calling"""
+        return self.tool_manager.get_tool_definitions()
+
+    def execute_tool(self, tool_name: str, **kwargs) -> str:
+        """Execute a tool by name and record the sources it returns"""
+        try:
+            result = self.tool_manager.execute_tool_with_sources(tool_name, **kwargs)
+        except Exception:
+            self.failed = True
+            raise
+
+        with self._lock:
+            self.sources.extend(result.sources)
+            self.source_links.extend(result.source_links)
+            self.failed = self.failed or result.failed
+        return result.text
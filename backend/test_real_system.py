@@ -3,11 +3,87 @@
 Test script to diagnose the real RAG system issues
 """
 
+import io
 import sys
 import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from config import config
 from rag_system import RAGSystem
 
+DOC_EXTENSIONS = {".pdf", ".txt", ".docx"}
+
+
+class _ThreadOutput(io.TextIOBase):
+    """stdout proxy that buffers each running diagnostic's output"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def run(self, test_func, rag_system):
+        """Run one diagnostic and write everything it printed in one go"""
+        self._local.buffer = io.StringIO()
+        try:
+            return test_func(rag_system)
+        finally:
+            text = self._local.buffer.getvalue()
+            self._local.buffer = None
+            with self._lock:
+                self.stream.write(text)
+                self.stream.flush()
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            return self.stream.write(text)
+        return buffer.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+@contextmanager
+def buffered_stdout():
+    """Route prints through a _ThreadOutput for the duration of the block"""
+    output = _ThreadOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        yield output
+    finally:
+        sys.stdout = output.stream
+
+
+def run_serial(tests, rag_system):
+    """Run diagnostics in order, writing each one's output in a single call"""
+    with buffered_stdout() as output:
+        return {
+            test_name: output.run(test_func, rag_system)
+            for test_name, test_func in tests
+        }
+
+
+def run_parallel(tests, rag_system, max_workers=4):
+    """Run independent diagnostics concurrently, printing each one's output whole"""
+    with buffered_stdout() as output:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                test_name: executor.submit(output.run, test_func, rag_system)
+                for test_name, test_func in tests
+            }
+
+    # Report in the declared order rather than completion order
+    return {test_name: future.result() for test_name, future in futures.items()}
+
+
+def existing_course_titles(rag_system):
+    """Course titles in the store, fetched once per diagnostic run"""
+    if getattr(rag_system, "_cached_titles", None) is None:
+        rag_system._cached_titles = rag_system.vector_store.get_existing_course_titles()
+    return rag_system._cached_titles
+
 
 def test_system_initialization():
     """Test if RAG system initializes properly"""
@@ -31,7 +107,7 @@ def test_vector_store(rag_system):
 
     try:
         # Check if courses exist
-        course_titles = rag_system.vector_store.get_existing_course_titles()
+        course_titles = existing_course_titles(rag_system)
         print(f"Found {len(course_titles)} existing courses: {course_titles}")
 
         if not course_titles:
@@ -163,18 +239,24 @@ def test_data_loading(rag_system):
             return False
 
         # List available documents
-        doc_files = [
-            f for f in os.listdir(docs_path) if f.endswith((".pdf", ".txt", ".docx"))
-        ]
+        with os.scandir(docs_path) as entries:
+            doc_files = [
+                entry.name
+                for entry in entries
+                if entry.is_file(follow_symlinks=False)
+                and os.path.splitext(entry.name)[1].lower() in DOC_EXTENSIONS
+            ]
         print(f"Found {len(doc_files)} document files: {doc_files}")
 
         # Check if data is already loaded
-        existing_courses = rag_system.vector_store.get_existing_course_titles()
+        existing_courses = existing_course_titles(rag_system)
         print(f"Existing courses in DB: {len(existing_courses)}")
 
         if not existing_courses:
             print("Attempting to load course data...")
             courses_added, chunks_added = rag_system.add_course_folder(docs_path)
+            # The catalog changed, so later checks must re-read the titles
+            rag_system._cached_titles = None
             print(f"Added {courses_added} courses, {chunks_added} chunks")
 
             if courses_added == 0:
@@ -225,6 +307,36 @@ def test_end_to_end_query(rag_system):
         return False
 
 
+def test_batch_queries(rag_system):
+    """Test answering sample queries through the Message Batches API"""
+    print("\n=== Testing Batch Queries ===")
+
+    try:
+        queries = [
+            "What is MCP?",
+            "What does the computer use course cover?",
+        ]
+        print(f"Submitting batch of {len(queries)} queries (may take minutes)...")
+        results = rag_system.query_batch(queries)
+
+        answered = sum(1 for text in results.values() if text)
+        print(f"Batch answered {answered}/{len(queries)} queries")
+
+        if answered < len(queries):
+            print("⚠ Some batched queries did not succeed")
+            return False
+
+        print("✓ Batch queries successful")
+        return True
+
+    except Exception as e:
+        print(f"✗ Batch query test failed: {e}")
+        import traceback
+
+        traceback.print_exc()
+        return False
+
+
 def main():
     """Run all diagnostic tests"""
     print("RAG System Diagnostic Test")
@@ -236,19 +348,30 @@ def main():
         print("\n❌ CRITICAL: System initialization failed - cannot continue")
         return
 
-    # Run diagnostic tests
-    tests = [
-        ("Data Loading", test_data_loading),
-        ("Vector Store", test_vector_store),
-        ("Search Tool", test_search_tool),
-        ("Tool Manager", test_tool_manager),
-        ("AI Generator Config", test_ai_generator),
-        ("End-to-End Query", test_end_to_end_query),
-    ]
-
-    results = {}
-    for test_name, test_func in tests:
-        results[test_name] = test_func(rag_system)
+    # Everything else reads the data this loads, so it runs first
+    results = run_serial([("Data Loading", test_data_loading)], rag_system)
+
+    # These checks are independent of each other
+    results.update(
+        run_parallel(
+            [
+                ("Vector Store", test_vector_store),
+                ("Search Tool", test_search_tool),
+                ("Tool Manager", test_tool_manager),
+                ("AI Generator Config", test_ai_generator),
+            ],
+            rag_system,
+        )
+    )
+
+    # End-to-end exercises the whole stack, so keep it last
+    tests = [("End-to-End Query", test_end_to_end_query)]
+
+    # Batches are slow to complete, so only run them when asked
+    if "--batch" in sys.argv:
+        tests.append(("Batch Queries", test_batch_queries))
+
+    results.update(run_serial(tests, rag_system))
 
     # Print summary
     print("\n" + "=" * 50)
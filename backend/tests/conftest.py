@@ -1,20 +1,57 @@
 import os
+import shutil
 import sys
 import tempfile
-from typing import Any, Dict, List
-from unittest.mock import MagicMock, Mock, patch
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from unittest.mock import MagicMock, Mock, create_autospec, patch
 
 import pytest
+from anthropic import Anthropic
+from anthropic.resources.messages import Batches, Messages
+from chromadb.api.models.Collection import Collection
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.testclient import TestClient
+from pydantic import BaseModel
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from ai_generator import AIGenerator, _async_clients, _get_client
 from config import Config
+from document_processor import DocumentProcessor
 from models import Course, CourseChunk, Lesson
-from vector_store import SearchResults
+from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
+from session_manager import SessionManager
+from vector_store import SearchResults, VectorStore
 
+# Plain attribute container is far cheaper than a Mock tree; tests only read it
+_CANONICAL_RESPONSE = SimpleNamespace(
+    content=[
+        SimpleNamespace(type="text", text="This is a test response from Claude.")
+    ],
+    stop_reason="end_turn",
+)
 
-@pytest.fixture
+
+@pytest.fixture(autouse=True)
+def reset_anthropic_client():
+    """Drop the shared Anthropic clients so each test sees its own patched client"""
+    _get_client.cache_clear()
+    _async_clients.clear()
+    yield
+    _get_client.cache_clear()
+    _async_clients.clear()
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    """Make time.sleep a no-op so batch polling and SDK retry backoff cost nothing"""
+    monkeypatch.setattr("time.sleep", lambda *args, **kwargs: None)
+
+
+@pytest.fixture(scope="session")
 def sample_course():
     """Create a sample course for testing"""
     lessons = [
@@ -43,7 +80,7 @@ def sample_course():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_course_chunks():
     """Create sample course chunks for testing"""
     return [
@@ -92,22 +129,35 @@ def sample_search_results():
     )
 
 
+# Results nothing mutates, so every test can share one instance of each
+_EMPTY_SEARCH_RESULTS = SearchResults(documents=[], metadata=[], distances=[])
+_ERROR_SEARCH_RESULTS = SearchResults.empty("Search error: Database connection failed")
+
+
 @pytest.fixture
 def empty_search_results():
     """Create empty search results for testing"""
-    return SearchResults(documents=[], metadata=[], distances=[])
+    return _EMPTY_SEARCH_RESULTS
 
 
 @pytest.fixture
 def error_search_results():
     """Create error search results for testing"""
-    return SearchResults.empty("Search error: Database connection failed")
+    return _ERROR_SEARCH_RESULTS
+
+
+@pytest.fixture(scope="session")
+def _mock_vector_store_cached():
+    """Build the mock vector store once for the whole session"""
+    return Mock()
 
 
 @pytest.fixture
-def mock_vector_store():
+def mock_vector_store(_mock_vector_store_cached):
     """Create a mock vector store for testing"""
-    mock = Mock()
+    # Reset the shared mock so return values and calls don't leak between tests
+    mock = _mock_vector_store_cached
+    mock.reset_mock(return_value=True, side_effect=True)
     mock.search.return_value = SearchResults(
         documents=["Sample document content"],
         metadata=[{"course_title": "Test Course", "lesson_number": 1}],
@@ -119,27 +169,40 @@ def mock_vector_store():
 
 
 @pytest.fixture
-def mock_anthropic_client():
+def make_search_results(mock_vector_store):
+    """Factory that builds SearchResults and has mock_vector_store return them"""
+
+    def _make(documents, metadata, distances=None, error=None):
+        results = SearchResults(
+            documents=documents,
+            metadata=metadata,
+            distances=distances or [0.1] * len(documents),
+            error=error,
+        )
+        mock_vector_store.search.return_value = results
+        return results
+
+    return _make
+
+
+@pytest.fixture(scope="session")
+def _mock_anthropic_client_cached():
+    """Build the autospecced Anthropic client once for the whole session"""
+    client = create_autospec(Anthropic, instance=True)
+    # Resources are cached_properties autospec can't see; spec them separately
+    # so calls are checked against the SDK's method signatures
+    client.messages = create_autospec(Messages, instance=True, spec_set=True)
+    client.messages.batches = create_autospec(Batches, instance=True, spec_set=True)
+    return client
+
+
+@pytest.fixture
+def mock_anthropic_client(_mock_anthropic_client_cached):
     """Create a mock Anthropic client for testing"""
-    mock_client = Mock()
-
-    # Mock response for direct text response
-    mock_response = Mock()
-    mock_response.content = [Mock()]
-    mock_response.content[0].text = "This is a test response from Claude."
-    mock_response.stop_reason = "end_turn"
-
-    # Mock response for tool use
-    mock_tool_response = Mock()
-    mock_tool_response.stop_reason = "tool_use"
-    mock_tool_content = Mock()
-    mock_tool_content.type = "tool_use"
-    mock_tool_content.name = "search_course_content"
-    mock_tool_content.id = "tool_123"
-    mock_tool_content.input = {"query": "test query"}
-    mock_tool_response.content = [mock_tool_content]
-
-    mock_client.messages.create.return_value = mock_response
+    # Resetting the shared tree is much cheaper than building a new one
+    mock_client = _mock_anthropic_client_cached
+    mock_client.reset_mock(return_value=True, side_effect=True)
+    mock_client.messages.create.return_value = _CANONICAL_RESPONSE
     return mock_client
 
 
@@ -166,6 +229,59 @@ def mock_tool_manager():
     return mock
 
 
+_RAG_COMPONENTS = (
+    DocumentProcessor,
+    VectorStore,
+    AIGenerator,
+    SessionManager,
+    CourseSearchTool,
+    CourseOutlineTool,
+    ToolManager,
+)
+
+
+@pytest.fixture(scope="session")
+def _rag_component_instances():
+    """Build one spec'd instance mock per RAGSystem collaborator for the session"""
+    return {cls.__name__: MagicMock(spec=cls) for cls in _RAG_COMPONENTS}
+
+
+@pytest.fixture
+def rag_mocks(monkeypatch, _rag_component_instances):
+    """Replace every component RAGSystem wires up with a MagicMock class"""
+    import rag_system
+
+    mocks = SimpleNamespace()
+    for name, instance in _rag_component_instances.items():
+        # Resetting the cached instance skips re-introspecting its spec
+        instance.reset_mock(return_value=True, side_effect=True)
+        mock = MagicMock(return_value=instance)
+        monkeypatch.setattr(rag_system, name, mock)
+        setattr(mocks, name, mock)
+    return mocks
+
+
+@pytest.fixture(scope="session")
+def mock_config():
+    """Mock configuration for RAG system, built once and shared read-only"""
+    # Only ever read, so a plain namespace beats a Mock's call machinery
+    return SimpleNamespace(
+        CHUNK_SIZE=800,
+        CHUNK_OVERLAP=100,
+        CHROMA_PATH="./test_chroma",
+        EMBEDDING_MODEL="test-model",
+        MAX_RESULTS=5,
+        ANTHROPIC_API_KEY="test-api-key",
+        ANTHROPIC_MODEL="claude-sonnet-4-20250514",
+        REQUEST_TIMEOUT=30.0,
+        MAX_RETRIES=2,
+        SKIP_ROUND2_WHEN_TEXT_PRESENT=False,
+        MAX_HISTORY=2,
+        RESPONSE_CACHE_SIZE=1024,
+        RESPONSE_CACHE_TTL=600.0,
+    )
+
+
 @pytest.fixture
 def test_config():
     """Create a test configuration with proper settings"""
@@ -202,32 +318,35 @@ def temp_chroma_db():
     temp_dir = tempfile.mkdtemp()
     yield temp_dir
     # Cleanup after test
-    import shutil
-
     shutil.rmtree(temp_dir, ignore_errors=True)
 
 
+# Chroma results nothing mutates, so every test can share one instance of each
+_SAMPLE_CHROMA_QUERY_RESULT = {
+    "documents": [["Sample document"]],
+    "metadatas": [[{"course_title": "Test Course", "lesson_number": 1}]],
+    "distances": [[0.1]],
+}
+_SAMPLE_CHROMA_GET_RESULT = {
+    "ids": ["test_course_1"],
+    "metadatas": [
+        {
+            "title": "Test Course",
+            "instructor": "Test Instructor",
+            "course_link": "https://example.com/course",
+            "lessons_json": '[{"lesson_number": 1, "lesson_title": "Test Lesson", "lesson_link": "https://example.com/lesson1"}]',
+            "lesson_count": 1,
+        }
+    ],
+}
+
+
 @pytest.fixture
 def mock_chroma_collection():
     """Create a mock ChromaDB collection for testing"""
-    mock = Mock()
-    mock.query.return_value = {
-        "documents": [["Sample document"]],
-        "metadatas": [[{"course_title": "Test Course", "lesson_number": 1}]],
-        "distances": [[0.1]],
-    }
-    mock.get.return_value = {
-        "ids": ["test_course_1"],
-        "metadatas": [
-            {
-                "title": "Test Course",
-                "instructor": "Test Instructor",
-                "course_link": "https://example.com/course",
-                "lessons_json": '[{"lesson_number": 1, "lesson_title": "Test Lesson", "lesson_link": "https://example.com/lesson1"}]',
-                "lesson_count": 1,
-            }
-        ],
-    }
+    mock = Mock(spec=Collection)
+    mock.query.return_value = _SAMPLE_CHROMA_QUERY_RESULT
+    mock.get.return_value = _SAMPLE_CHROMA_GET_RESULT
     return mock
 
 
@@ -273,12 +392,6 @@ def mock_rag_system():
 @pytest.fixture
 def test_app():
     """Create a test FastAPI app with mocked dependencies"""
-    from fastapi import FastAPI
-    from fastapi.middleware.cors import CORSMiddleware
-    from fastapi.middleware.trustedhost import TrustedHostMiddleware
-    from pydantic import BaseModel
-    from typing import List, Optional
-    
     # Create test app without static file mounting
     app = FastAPI(title="Course Materials RAG System Test", root_path="")
     
@@ -1,527 +1,1274 @@
+import asyncio
+import copy
+import json
 import os
 import sys
-from unittest.mock import MagicMock, Mock, patch
+from collections import namedtuple
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
+import httpx
 import pytest
+from anthropic import Anthropic, AsyncAnthropic
 
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from ai_generator import AIGenerator
 
+# Guidance the system prompt must keep
+REQUIRED_PROMPT_PHRASES = (
+    "course materials and educational content",
+    "Content Search Tool",
+    "Course Outline Tool",
+    "You can make up to 2 rounds of tool calls",
+    "Brief, Concise and focused",
+)
+
+
+def _message(content, stop_reason="end_turn"):
+    """Messages API response body as the server sends it, pre-encoded"""
+    body = {
+        "id": "msg_test",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-sonnet-4-20250514",
+        "content": content,
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 5},
+    }
+    return json.dumps(body).encode()
+
+
+_JSON_HEADERS = {"content-type": "application/json"}
+_TEXT_RESPONSE = _message([{"type": "text", "text": "Transport answer."}])
+_TOOL_USE_RESPONSE = _message(
+    [
+        {
+            "type": "tool_use",
+            "id": "tool_123",
+            "name": "search_course_content",
+            "input": {"query": "test query"},
+        }
+    ],
+    stop_reason="tool_use",
+)
+
+
+def _replay_transport(*payloads):
+    """httpx transport that replays encoded payloads and records request bodies"""
+    bodies = []
+    responses = iter(payloads)
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, content=next(responses), headers=_JSON_HEADERS)
+
+    return httpx.MockTransport(handler), bodies
+
+
+async def _collect(stream):
+    """Drain an async iterator into a list"""
+    return [item async for item in stream]
+
+
+# Text content block; only .type and .text are ever read
+_TextBlock = namedtuple("_TextBlock", ["text", "type"], defaults=["text"])
+
+
+def _tool_use(name, input, id):
+    """Build a tool_use content block; tests only read its attributes"""
+    return SimpleNamespace(type="tool_use", name=name, input=input, id=id)
+
+
+def _tool_round(*blocks):
+    """Response that asks for the given tool calls"""
+    return SimpleNamespace(stop_reason="tool_use", content=list(blocks))
+
+
+class _FakeToolManager:
+    """Plain ToolManager stand-in that records every execute_tool call"""
+
+    TOOL_DEFINITIONS = [
+        {
+            "name": "search_course_content",
+            "description": "Search course materials",
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "What to search for"}
+                },
+                "required": ["query"],
+            },
+        }
+    ]
+
+    def __init__(self, result="Mock search result"):
+        # A fixed value, an exception to raise, or a callable taking the call
+        self.result = result
+        self.calls = []
+
+    def get_tool_definitions(self):
+        return self.TOOL_DEFINITIONS
+
+    def execute_tool(self, tool_name, **kwargs):
+        self.calls.append((tool_name, kwargs))
+        if isinstance(self.result, Exception):
+            raise self.result
+        if callable(self.result):
+            return self.result(tool_name, **kwargs)
+        return self.result
+
+
+async def _text_stream(*chunks):
+    """Yield chunks the way the SDK's text_stream does"""
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.fixture(autouse=True, scope="module")
+def _patched_anthropic():
+    """Patch both Anthropic client classes once for the whole module"""
+    with (
+        patch("ai_generator.anthropic.Anthropic") as sync_cls,
+        patch("ai_generator.anthropic.AsyncAnthropic") as async_cls,
+    ):
+        yield sync_cls, async_cls
+
+
+@pytest.fixture
+def mock_anthropic(_patched_anthropic):
+    """The patched Anthropic class, reset so no state leaks between tests"""
+    sync_cls, _ = _patched_anthropic
+    sync_cls.reset_mock(return_value=True, side_effect=True)
+    return sync_cls
+
+
+@pytest.fixture
+def mock_async_anthropic(_patched_anthropic):
+    """The patched AsyncAnthropic class, reset so no state leaks between tests"""
+    _, async_cls = _patched_anthropic
+    async_cls.reset_mock(return_value=True, side_effect=True)
+    return async_cls
+
+
+@pytest.fixture(scope="module")
+def _generator_proto(_patched_anthropic):
+    """One AIGenerator built against the patched clients for the module"""
+    return AIGenerator("test-api-key", "claude-sonnet-4-20250514")
 
+
+@pytest.fixture
+def tool_manager():
+    """Fresh fake tool manager returning "Mock search result" for every call"""
+    return _FakeToolManager()
+
+
+@pytest.fixture
+def generator(_generator_proto):
+    """Shallow copy of the prototype; tests assign their own mock clients"""
+    return copy.copy(_generator_proto)
+
+
+@pytest.mark.unit
 class TestAIGenerator:
     """Test cases for AIGenerator"""
 
-    def test_init(self):
+    def test_init(self, generator):
         """Test AIGenerator initialization"""
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-
         assert generator.model == "claude-sonnet-4-20250514"
         assert generator.base_params["model"] == "claude-sonnet-4-20250514"
         assert generator.base_params["temperature"] == 0
         assert generator.base_params["max_tokens"] == 800
 
-    def test_generate_response_without_tools(self, mock_anthropic_client):
+    def test_client_shared_across_instances(self, mock_anthropic):
+        """Test that generators with the same API key reuse one pooled client"""
+        mock_anthropic.side_effect = lambda **kwargs: Mock()
+
+        first = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
+        second = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
+        other = AIGenerator("other-api-key", "claude-sonnet-4-20250514")
+
+        assert first.client is second.client
+        assert other.client is not first.client
+        assert mock_anthropic.call_count == 2
+
+    def test_client_timeout_and_retries(self, mock_anthropic):
+        """Test that request timeout and retry settings reach the client"""
+        AIGenerator(
+            "test-api-key",
+            "claude-sonnet-4-20250514",
+            request_timeout=12.5,
+            max_retries=4,
+        )
+
+        kwargs = mock_anthropic.call_args[1]
+        assert kwargs["timeout"].read == 12.5
+        assert kwargs["timeout"].connect == 5.0
+        assert kwargs["max_retries"] == 4
+
+    def test_generate_response_without_tools(self, mock_anthropic_client, generator):
         """Test basic response generation without tools"""
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_anthropic.return_value = mock_anthropic_client
-
-            generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
+        generator.client = mock_anthropic_client
 
-            # Generate response
-            response = generator.generate_response("What is AI?")
+        # Generate response
+        response = generator.generate_response("What is AI?")
 
-            # Assert
-            assert response == "This is a test response from Claude."
+        # Assert
+        assert response == "This is a test response from Claude."
 
-            # Verify API was called correctly
-            mock_anthropic_client.messages.create.assert_called_once()
-            call_args = mock_anthropic_client.messages.create.call_args[1]
+        # Verify API was called correctly
+        mock_anthropic_client.messages.create.assert_called_once()
+        call_args = mock_anthropic_client.messages.create.call_args[1]
 
-            assert call_args["model"] == "claude-sonnet-4-20250514"
-            assert call_args["temperature"] == 0
-            assert call_args["max_tokens"] == 800
-            assert call_args["messages"] == [{"role": "user", "content": "What is AI?"}]
-            assert "tools" not in call_args
+        assert call_args["model"] == "claude-sonnet-4-20250514"
+        assert call_args["temperature"] == 0
+        assert call_args["max_tokens"] == 800
+        assert call_args["messages"] == [{"role": "user", "content": "What is AI?"}]
+        assert "tools" not in call_args
 
-    def test_generate_response_with_conversation_history(self, mock_anthropic_client):
+    def test_generate_response_with_conversation_history(
+        self, mock_anthropic_client, generator
+    ):
         """Test response generation with conversation history"""
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_anthropic.return_value = mock_anthropic_client
+        generator.client = mock_anthropic_client
+
+        history = "Previous conversation context"
+        response = generator.generate_response(
+            "Follow up question", conversation_history=history
+        )
+
+        # Assert
+        assert response == "This is a test response from Claude."
+
+        # Verify history follows the cached static system block
+        call_args = mock_anthropic_client.messages.create.call_args[1]
+        assert call_args["system"][0] == AIGenerator.SYSTEM_BLOCK
+        assert "Previous conversation context" in call_args["system"][1]["text"]
+        assert "cache_control" not in call_args["system"][1]
+
+    def test_trim_history_keeps_recent_turns(self, generator):
+        """Test that long history is cut back to the newest whole turns"""
+        history = "\n".join(
+            [
+                "User: " + "a" * 50,
+                "Assistant: " + "b" * 50,
+                "User: " + "c" * 20,
+                "Assistant: " + "d" * 20,
+            ]
+        )
 
-            generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
+        assert generator._trim_history(history, max_chars=len(history)) == history
+        assert generator._trim_history(history, max_chars=60) == (
+            "User: " + "c" * 20 + "\nAssistant: " + "d" * 20
+        )
+        # A single oversized turn falls back to its tail
+        assert generator._trim_history(history, max_chars=10) == "d" * 10
 
-            history = "Previous conversation context"
-            response = generator.generate_response(
-                "Follow up question", conversation_history=history
-            )
+    def test_history_text_reused_across_calls(self, generator):
+        """Test that the same history is only trimmed and labelled once"""
+        AIGenerator._history_text.cache_clear()
 
-            # Assert
-            assert response == "This is a test response from Claude."
+        history = "User: What is MCP?\nAssistant: A protocol."
+        first, _ = generator._prepare_prompt(history, None)
+        second, _ = generator._prepare_prompt(history, None)
 
-            # Verify system prompt includes history
-            call_args = mock_anthropic_client.messages.create.call_args[1]
-            assert "Previous conversation context" in call_args["system"]
+        assert first[1]["text"] == f"Previous conversation:\n{history}"
+        assert second[1]["text"] is first[1]["text"]
+        assert AIGenerator._history_text.cache_info().hits == 1
 
-    def test_generate_response_with_tools_no_tool_use(
-        self, mock_anthropic_client, mock_tool_manager
+    def test_generate_response_trims_long_history(
+        self, mock_anthropic_client, generator
     ):
-        """Test response generation with tools available but not used"""
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_anthropic.return_value = mock_anthropic_client
-
-            generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-
-            tools = mock_tool_manager.get_tool_definitions()
-            response = generator.generate_response(
-                "What is machine learning?", tools=tools, tool_manager=mock_tool_manager
-            )
+        """Test that history beyond the budget is not sent to Claude"""
+        generator.client = mock_anthropic_client
+        generator.MAX_HISTORY_CHARS = 30
 
-            # Assert
-            assert response == "This is a test response from Claude."
+        history = "User: old question\nAssistant: old answer\nUser: recent"
+        generator.generate_response("Follow up", conversation_history=history)
 
-            # Verify tools were passed to API
-            call_args = mock_anthropic_client.messages.create.call_args[1]
-            assert "tools" in call_args
-            assert call_args["tool_choice"] == {"type": "auto"}
-            assert call_args["tools"] == tools
+        call_args = mock_anthropic_client.messages.create.call_args[1]
+        history_text = call_args["system"][1]["text"]
+        assert "User: recent" in history_text
+        assert "old question" not in history_text
 
-    def test_generate_response_with_tool_use(self, mock_tool_manager):
+    def test_generate_response_with_tools_no_tool_use(
+        self,
+        mock_anthropic_client,
+        tool_manager,
+        generator,
+    ):
+        """Test response generation with tools available but not used"""
+        generator.client = mock_anthropic_client
+
+        tools = tool_manager.get_tool_definitions()
+        response = generator.generate_response(
+            "What is machine learning?", tools=tools, tool_manager=tool_manager
+        )
+
+        # Assert
+        assert response == "This is a test response from Claude."
+
+        # Verify tools were passed to API
+        call_args = mock_anthropic_client.messages.create.call_args[1]
+        assert "tools" in call_args
+        assert call_args["tool_choice"] == {"type": "auto"}
+        assert call_args["tools"][:-1] == tools[:-1]
+        assert call_args["tools"][-1] == {
+            **tools[-1],
+            "cache_control": {"type": "ephemeral"},
+        }
+        assert "cache_control" not in tools[-1]
+
+    def test_tool_rounds_use_smaller_token_budget(
+        self, mock_anthropic_client, tool_manager, generator
+    ):
+        """Test round 1 is capped and a cut-off round is redone with its tools"""
+        truncated_response = SimpleNamespace(
+            stop_reason="max_tokens", content=[_TextBlock("Let me search for")]
+        )
+
+        mock_anthropic_client.messages.create.side_effect = [
+            truncated_response,
+            _tool_round(
+                _tool_use("search_course_content", {"query": "lesson 1"}, "tool_1")
+            ),
+            SimpleNamespace(
+                stop_reason="end_turn", content=[_TextBlock("Lesson 1 covers MCP.")]
+            ),
+        ]
+
+        generator.client = mock_anthropic_client
+
+        response = generator.generate_response(
+            "What is in lesson 1?",
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        # The redone round still searches before answering
+        assert response == "Lesson 1 covers MCP."
+        assert tool_manager.calls == [("search_course_content", {"query": "lesson 1"})]
+
+        capped, redo, round2 = mock_anthropic_client.messages.create.call_args_list
+        assert capped[1]["max_tokens"] == AIGenerator.TOOL_ROUND_MAX_TOKENS
+        assert redo[1]["max_tokens"] == 800
+        assert redo[1]["tools"] == capped[1]["tools"]
+        assert "tools" in round2[1]
+
+    def test_second_round_keeps_full_token_budget(
+        self, mock_anthropic_client, tool_manager, generator
+    ):
+        """Test only round 1 is capped, so a long round-2 answer is kept"""
+        mock_anthropic_client.messages.create.side_effect = [
+            _tool_round(
+                _tool_use("search_course_content", {"query": "test query"}, "tool_1")
+            ),
+            SimpleNamespace(
+                stop_reason="max_tokens", content=[_TextBlock("A full answer")]
+            ),
+        ]
+
+        generator.client = mock_anthropic_client
+
+        response = generator.generate_response(
+            "Explain everything",
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        assert response == "A full answer"
+
+        round1, round2 = mock_anthropic_client.messages.create.call_args_list
+        assert round1[1]["max_tokens"] == AIGenerator.TOOL_ROUND_MAX_TOKENS
+        assert round2[1]["max_tokens"] == 800
+        assert "tools" in round2[1]
+
+    def test_generate_response_with_tool_use(
+        self, mock_anthropic_client, tool_manager, generator
+    ):
         """Test response generation when Claude requests tool use"""
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_client = Mock()
-            mock_anthropic.return_value = mock_client
-
-            # Mock initial response with tool use
-            initial_response = Mock()
-            initial_response.stop_reason = "tool_use"
-            initial_response.content = [Mock()]
-            initial_response.content[0].type = "tool_use"
-            initial_response.content[0].name = "search_course_content"
-            initial_response.content[0].id = "tool_123"
-            initial_response.content[0].input = {"query": "test query"}
-
-            # Mock final response after tool execution
-            final_response = Mock()
-            final_response.content = [Mock()]
-            final_response.content[0].text = (
-                "Based on the search results, here is the answer."
-            )
-
-            # Setup client to return initial then final response
-            mock_client.messages.create.side_effect = [initial_response, final_response]
-
-            generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-
-            tools = mock_tool_manager.get_tool_definitions()
-            response = generator.generate_response(
-                "What is in lesson 1?", tools=tools, tool_manager=mock_tool_manager
+        # Mock initial response with tool use
+        initial_response = _tool_round(
+            _tool_use("search_course_content", {"query": "test query"}, "tool_123")
+        )
+
+        # Mock final response after tool execution
+        final_response = SimpleNamespace(
+            stop_reason="end_turn",
+            content=[_TextBlock("Based on the search results, here is the answer.")],
+        )
+
+        # Setup client to return initial then final response
+        mock_anthropic_client.messages.create.side_effect = [
+            initial_response,
+            final_response,
+        ]
+
+        generator.client = mock_anthropic_client
+
+        tools = tool_manager.get_tool_definitions()
+        response = generator.generate_response(
+            "What is in lesson 1?", tools=tools, tool_manager=tool_manager
+        )
+
+        # Assert
+        assert response == "Based on the search results, here is the answer."
+
+        # Verify tool was executed
+        assert tool_manager.calls == [
+            ("search_course_content", {"query": "test query"})
+        ]
+
+        # Verify two API calls were made (initial + final)
+        assert mock_anthropic_client.messages.create.call_count == 2
+
+    def test_generate_response_logs_call_metrics(
+        self, mock_anthropic_client, tool_manager, caplog, generator
+    ):
+        """Test that each API call and tool run is logged with its latency"""
+        initial_response = Mock()
+        initial_response.stop_reason = "tool_use"
+        initial_response.usage.input_tokens = 120
+        initial_response.usage.output_tokens = 30
+        initial_response.content = [
+            _tool_use("search_course_content", {"query": "test query"}, "tool_123")
+        ]
+
+        final_response = Mock()
+        final_response.stop_reason = "end_turn"
+        final_response.usage.input_tokens = 400
+        final_response.usage.output_tokens = 60
+        final_response.content = [_TextBlock("Answer")]
+
+        mock_anthropic_client.messages.create.side_effect = [
+            initial_response,
+            final_response,
+        ]
+
+        generator.client = mock_anthropic_client
+
+        with caplog.at_level("INFO", logger="ai_generator"):
+            generator.generate_response(
+                "What is in lesson 1?",
+                tools=tool_manager.get_tool_definitions(),
+                tool_manager=tool_manager,
             )
 
-            # Assert
-            assert response == "Based on the search results, here is the answer."
-
-            # Verify tool was executed
-            mock_tool_manager.execute_tool.assert_called_once_with(
-                "search_course_content", query="test query"
+        events = [record.msg for record in caplog.records]
+        llm_calls = [e for e in events if e["event"] == "llm_call"]
+        tool_calls = [e for e in events if e["event"] == "tool_call"]
+
+        assert [e["round"] for e in llm_calls] == [1, 2]
+        assert llm_calls[0]["input_tokens"] == 120
+        assert llm_calls[1]["output_tokens"] == 60
+        assert llm_calls[1]["stop_reason"] == "end_turn"
+        assert all(e["latency_ms"] >= 0 for e in llm_calls)
+
+        assert len(tool_calls) == 1
+        assert tool_calls[0]["tool"] == "search_course_content"
+        assert tool_calls[0]["status"] == "ok"
+
+    @pytest.mark.parametrize("skip_round2, expected_calls", [(True, 1), (False, 2)])
+    def test_text_alongside_tool_use_skips_round2(
+        self,
+        tool_manager,
+        skip_round2,
+        expected_calls,
+        mock_anthropic,
+    ):
+        """Test that a complete text answer next to tool calls can end early"""
+        mock_client = Mock()
+        mock_anthropic.return_value = mock_client
+
+        text_block = _TextBlock("The course has four lessons. " * 10)
+        tool_block = _tool_use("get_course_outline", {"course_name": "MCP"}, "tool_123")
+
+        initial_response = _tool_round(text_block, tool_block)
+
+        final_response = SimpleNamespace(
+            stop_reason="end_turn", content=[_TextBlock("Second round answer.")]
+        )
+
+        mock_client.messages.create.side_effect = [initial_response, final_response]
+        tool_manager.result = "No course found matching 'MCP'"
+
+        generator = AIGenerator(
+            "test-api-key",
+            "claude-sonnet-4-20250514",
+            skip_round2_when_text_present=skip_round2,
+        )
+
+        response = generator.generate_response(
+            "What is in the MCP course?",
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        assert mock_client.messages.create.call_count == expected_calls
+        if skip_round2:
+            assert response == text_block.text.strip()
+        else:
+            assert response == "Second round answer."
+
+    def test_early_answer_needs_uninformative_tools(self):
+        """Test that any tool content or short text still needs another round"""
+        generator = AIGenerator(
+            "test-api-key",
+            "claude-sonnet-4-20250514",
+            skip_round2_when_text_present=True,
+        )
+
+        response = _tool_round(_TextBlock("Lesson 1 covers the basics. " * 10))
+
+        def tool_messages(content):
+            return [{"role": "user", "content": [{"content": content}]}]
+
+        assert generator._early_answer(response, tool_messages("")) is not None
+        assert (
+            generator._early_answer(
+                response, tool_messages("No relevant content found in course 'MCP'.")
             )
-
-            # Verify two API calls were made (initial + final)
-            assert mock_client.messages.create.call_count == 2
-
-    def test_generate_response_tool_use_multiple_tools(self, mock_tool_manager):
+            is not None
+        )
+        assert (
+            generator._early_answer(response, tool_messages("Lesson 1 covers")) is None
+        )
+        assert generator._early_answer(response, tool_messages("New facts")) is None
+
+        short_response = _tool_round(_TextBlock("Short."))
+        assert generator._early_answer(short_response, tool_messages("")) is None
+
+    def test_generate_response_tool_use_multiple_tools(
+        self, mock_anthropic_client, tool_manager, generator
+    ):
         """Test response generation when Claude requests multiple tools"""
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_client = Mock()
-            mock_anthropic.return_value = mock_client
-
-            # Mock initial response with multiple tool uses
-            initial_response = Mock()
-            initial_response.stop_reason = "tool_use"
-
-            # Create two tool use content blocks
-            tool1 = Mock()
-            tool1.type = "tool_use"
-            tool1.name = "search_course_content"
-            tool1.id = "tool_123"
-            tool1.input = {"query": "first query"}
-
-            tool2 = Mock()
-            tool2.type = "tool_use"
-            tool2.name = "get_course_outline"
-            tool2.id = "tool_456"
-            tool2.input = {"course_name": "Test Course"}
-
-            initial_response.content = [tool1, tool2]
-
-            # Mock final response
-            final_response = Mock()
-            final_response.content = [Mock()]
-            final_response.content[0].text = "Here's the comprehensive answer."
-
-            mock_client.messages.create.side_effect = [initial_response, final_response]
-
-            generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-
-            # Execute
-            response = generator.generate_response(
-                "Tell me about the course",
-                tools=mock_tool_manager.get_tool_definitions(),
-                tool_manager=mock_tool_manager,
-            )
-
-            # Assert
-            assert response == "Here's the comprehensive answer."
-
-            # Verify both tools were executed
-            assert mock_tool_manager.execute_tool.call_count == 2
-            mock_tool_manager.execute_tool.assert_any_call(
-                "search_course_content", query="first query"
-            )
-            mock_tool_manager.execute_tool.assert_any_call(
-                "get_course_outline", course_name="Test Course"
-            )
-
-    def test_handle_tool_execution_conversation_flow(self, mock_tool_manager):
+        # Mock initial response with multiple tool uses
+        tool1 = _tool_use("search_course_content", {"query": "first query"}, "tool_123")
+
+        tool2 = _tool_use(
+            "get_course_outline", {"course_name": "Test Course"}, "tool_456"
+        )
+
+        initial_response = _tool_round(tool1, tool2)
+
+        # Mock final response
+        final_response = SimpleNamespace(
+            stop_reason="end_turn",
+            content=[_TextBlock("Here's the comprehensive answer.")],
+        )
+
+        mock_anthropic_client.messages.create.side_effect = [
+            initial_response,
+            final_response,
+        ]
+
+        generator.client = mock_anthropic_client
+
+        # Execute
+        response = generator.generate_response(
+            "Tell me about the course",
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        # Assert
+        assert response == "Here's the comprehensive answer."
+
+        # Verify both tools were executed
+        assert len(tool_manager.calls) == 2
+        assert ("search_course_content", {"query": "first query"}) in (
+            tool_manager.calls
+        )
+        assert ("get_course_outline", {"course_name": "Test Course"}) in (
+            tool_manager.calls
+        )
+
+    def test_handle_tool_execution_conversation_flow(
+        self, mock_anthropic_client, tool_manager, generator
+    ):
         """Test that tool execution properly maintains conversation flow"""
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_client = Mock()
-            mock_anthropic.return_value = mock_client
-
-            # Mock initial response with tool use
-            initial_response = Mock()
-            initial_response.stop_reason = "tool_use"
-            initial_response.content = [Mock()]
-            initial_response.content[0].type = "tool_use"
-            initial_response.content[0].name = "search_course_content"
-            initial_response.content[0].id = "tool_123"
-            initial_response.content[0].input = {"query": "lesson content"}
-
-            # Mock final response
-            final_response = Mock()
-            final_response.content = [Mock()]
-            final_response.content[0].text = "Final answer with tool results."
-
-            mock_client.messages.create.side_effect = [initial_response, final_response]
-
-            generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-
-            # Execute
-            response = generator.generate_response(
-                "What's in lesson 1?",
-                tools=mock_tool_manager.get_tool_definitions(),
-                tool_manager=mock_tool_manager,
-            )
-
-            # Verify the conversation flow in the final API call
-            final_call_args = mock_client.messages.create.call_args_list[1][1]
-            messages = final_call_args["messages"]
-
-            # Should have: user message, assistant tool use, user tool results
-            assert len(messages) == 3
-            assert messages[0]["role"] == "user"
-            assert messages[0]["content"] == "What's in lesson 1?"
-            assert messages[1]["role"] == "assistant"
-            assert messages[1]["content"] == initial_response.content
-            assert messages[2]["role"] == "user"
-            assert messages[2]["content"][0]["type"] == "tool_result"
-            assert messages[2]["content"][0]["tool_use_id"] == "tool_123"
-            assert messages[2]["content"][0]["content"] == "Mock search result"
-
-    def test_generate_response_tool_execution_error(self, mock_tool_manager):
+        # Mock initial response with tool use
+        initial_response = _tool_round(
+            _tool_use("search_course_content", {"query": "lesson content"}, "tool_123")
+        )
+
+        # Mock final response
+        final_response = SimpleNamespace(
+            stop_reason="end_turn",
+            content=[_TextBlock("Final answer with tool results.")],
+        )
+
+        mock_anthropic_client.messages.create.side_effect = [
+            initial_response,
+            final_response,
+        ]
+
+        generator.client = mock_anthropic_client
+
+        # Execute
+        response = generator.generate_response(
+            "What's in lesson 1?",
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        # Verify the conversation flow in the final API call
+        final_call_args = mock_anthropic_client.messages.create.call_args_list[1][1]
+        messages = final_call_args["messages"]
+
+        # Should have: user message, assistant tool use, user tool results
+        assert len(messages) == 3
+        assert messages[0]["role"] == "user"
+        assert messages[0]["content"] == "What's in lesson 1?"
+        assert messages[1]["role"] == "assistant"
+        assert messages[1]["content"] == initial_response.content
+        assert messages[2]["role"] == "user"
+        assert messages[2]["content"][0]["type"] == "tool_result"
+        assert messages[2]["content"][0]["tool_use_id"] == "tool_123"
+        assert messages[2]["content"][0]["content"] == "Mock search result"
+
+    def test_generate_response_tool_execution_error(
+        self, mock_anthropic_client, tool_manager, generator
+    ):
         """Test handling when tool execution fails"""
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_client = Mock()
-            mock_anthropic.return_value = mock_client
-
-            # Mock initial response with tool use
-            initial_response = Mock()
-            initial_response.stop_reason = "tool_use"
-            initial_response.content = [Mock()]
-            initial_response.content[0].type = "tool_use"
-            initial_response.content[0].name = "search_course_content"
-            initial_response.content[0].id = "tool_123"
-            initial_response.content[0].input = {"query": "test"}
-
-            # Mock final response
-            final_response = Mock()
-            final_response.content = [Mock()]
-            final_response.content[0].text = "I encountered an error searching."
-
-            mock_client.messages.create.side_effect = [initial_response, final_response]
-
-            # Make tool execution return error
-            mock_tool_manager.execute_tool.return_value = "Error: Tool execution failed"
-
-            generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-
-            # Execute
-            response = generator.generate_response(
-                "Search for something",
-                tools=mock_tool_manager.get_tool_definitions(),
-                tool_manager=mock_tool_manager,
-            )
-
-            # Should still get a response even with tool error
-            assert response == "I encountered an error searching."
-
-            # Verify error was passed to Claude in tool result
-            final_call_args = mock_client.messages.create.call_args_list[1][1]
-            tool_result = final_call_args["messages"][2]["content"][0]
-            assert tool_result["content"] == "Error: Tool execution failed"
+        # Mock initial response with tool use
+        initial_response = _tool_round(
+            _tool_use("search_course_content", {"query": "test"}, "tool_123")
+        )
+
+        # Mock final response
+        final_response = SimpleNamespace(
+            stop_reason="end_turn",
+            content=[_TextBlock("I encountered an error searching.")],
+        )
+
+        mock_anthropic_client.messages.create.side_effect = [
+            initial_response,
+            final_response,
+        ]
+
+        # Make tool execution return error
+        tool_manager.result = "Error: Tool execution failed"
+
+        generator.client = mock_anthropic_client
+
+        # Execute
+        response = generator.generate_response(
+            "Search for something",
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        # Should still get a response even with tool error
+        assert response == "I encountered an error searching."
+
+        # Verify error was passed to Claude in tool result
+        final_call_args = mock_anthropic_client.messages.create.call_args_list[1][1]
+        tool_result = final_call_args["messages"][2]["content"][0]
+        assert tool_result["content"] == "Error: Tool execution failed"
+
+    def test_system_prompt_cached(self, mock_anthropic_client, generator):
+        """Test that the static system prompt is sent as a cacheable block"""
+        generator.client = mock_anthropic_client
+        generator.generate_response("What is AI?")
+
+        call_args = mock_anthropic_client.messages.create.call_args[1]
+        assert call_args["system"] == [
+            {
+                "type": "text",
+                "text": AIGenerator.SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+
+    def test_cached_prefix_identical_across_turns(self, tool_manager, generator):
+        """Test that only the uncached tail of the prompt changes between turns"""
+        tools = tool_manager.get_tool_definitions()
+
+        def cached_prefix(history):
+            system_content, prepared_tools = generator._prepare_prompt(history, tools)
+            # Tools then system blocks up to the last cache breakpoint
+            prefix = [*prepared_tools, *system_content[:1]]
+            return json.dumps(prefix), system_content[1:]
+
+        first_prefix, first_tail = cached_prefix(None)
+        second_prefix, second_tail = cached_prefix("User: What is MCP?")
+        third_prefix, third_tail = cached_prefix(
+            "User: What is MCP?\nAssistant: A protocol.\nUser: Who teaches it?"
+        )
+
+        assert first_prefix == second_prefix == third_prefix
+        assert first_tail == []
+        assert "cache_control" not in second_tail[0]
+        assert "cache_control" not in third_tail[0]
 
     def test_system_prompt_content(self):
         """Test that system prompt contains expected guidance"""
-        # Test that the static system prompt has the expected content
-        assert "course materials and educational content" in AIGenerator.SYSTEM_PROMPT
-        assert "Content Search Tool" in AIGenerator.SYSTEM_PROMPT
-        assert "Course Outline Tool" in AIGenerator.SYSTEM_PROMPT
-        assert "You can make up to 2 rounds of tool calls" in AIGenerator.SYSTEM_PROMPT
-        assert "Brief, Concise and focused" in AIGenerator.SYSTEM_PROMPT
-
-    def test_api_parameters_consistency(self, mock_anthropic_client):
+        # Report every missing phrase at once rather than stopping at the first
+        missing = [
+            phrase
+            for phrase in REQUIRED_PROMPT_PHRASES
+            if phrase not in AIGenerator.SYSTEM_PROMPT
+        ]
+        assert not missing, missing
+
+    def test_api_parameters_consistency(self, mock_anthropic_client, generator):
         """Test that API parameters are consistent across calls"""
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_anthropic.return_value = mock_anthropic_client
+        generator.client = mock_anthropic_client
 
-            generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
+        # Make multiple calls
+        generator.generate_response("First question")
+        generator.generate_response(
+            "Second question", conversation_history="Previous context"
+        )
 
-            # Make multiple calls
-            generator.generate_response("First question")
-            generator.generate_response(
-                "Second question", conversation_history="Previous context"
-            )
-
-            # Verify consistent parameters across calls
-            calls = mock_anthropic_client.messages.create.call_args_list
+        # Verify consistent parameters across calls
+        calls = mock_anthropic_client.messages.create.call_args_list
 
-            for call in calls:
-                args = call[1]
-                assert args["model"] == "claude-sonnet-4-20250514"
-                assert args["temperature"] == 0
-                assert args["max_tokens"] == 800
+        for call in calls:
+            args = call[1]
+            assert args["model"] == "claude-sonnet-4-20250514"
+            assert args["temperature"] == 0
+            assert args["max_tokens"] == 800
 
-    def test_no_tool_manager_with_tool_use(self):
+    def test_no_tool_manager_with_tool_use(self, mock_anthropic_client, generator):
         """Test behavior when tools are requested but no tool_manager provided"""
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_client = Mock()
-            mock_anthropic.return_value = mock_client
+        # Mock response with tool use
+        tool_response = SimpleNamespace(
+            stop_reason="tool_use", content=[_TextBlock("I need to use a tool")]
+        )
 
-            # Mock response with tool use
-            tool_response = Mock()
-            tool_response.stop_reason = "tool_use"
-            tool_response.content = [Mock()]
-            tool_response.content[0].text = "I need to use a tool"
+        mock_anthropic_client.messages.create.return_value = tool_response
 
-            mock_client.messages.create.return_value = tool_response
+        generator.client = mock_anthropic_client
 
-            generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-
-            # Execute with tools but no tool_manager
-            response = generator.generate_response(
-                "Search for something", tools=[{"name": "test_tool"}]
-            )
+        # Execute with tools but no tool_manager
+        response = generator.generate_response(
+            "Search for something", tools=[{"name": "test_tool"}]
+        )
 
-            # Should return the text from the tool use response
-            assert response == "I need to use a tool"
+        # Should return the text from the tool use response
+        assert response == "I need to use a tool"
 
-            # Should only make one API call (no tool execution)
-            assert mock_client.messages.create.call_count == 1
+        # Should only make one API call (no tool execution)
+        assert mock_anthropic_client.messages.create.call_count == 1
 
-    def test_empty_tool_results(self, mock_tool_manager):
+    def test_empty_tool_results(self, mock_anthropic_client, tool_manager, generator):
         """Test handling when no tool calls are made in tool_use response"""
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_client = Mock()
-            mock_anthropic.return_value = mock_client
-
-            # Mock response with tool_use stop_reason but no actual tool calls
-            initial_response = Mock()
-            initial_response.stop_reason = "tool_use"
-            initial_response.content = []  # No tool use blocks
-
-            final_response = Mock()
-            final_response.content = [Mock()]
-            final_response.content[0].text = "No tools were actually used."
-
-            mock_client.messages.create.side_effect = [initial_response, final_response]
-
-            generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-
-            # Execute
-            response = generator.generate_response(
-                "Test query",
-                tools=mock_tool_manager.get_tool_definitions(),
-                tool_manager=mock_tool_manager,
+        # Mock response with tool_use stop_reason but no actual tool calls
+        # No tool use blocks
+        initial_response = SimpleNamespace(stop_reason="tool_use", content=[])
+
+        final_response = SimpleNamespace(
+            stop_reason="end_turn", content=[_TextBlock("No tools were actually used.")]
+        )
+
+        mock_anthropic_client.messages.create.side_effect = [
+            initial_response,
+            final_response,
+        ]
+
+        generator.client = mock_anthropic_client
+
+        # Execute
+        response = generator.generate_response(
+            "Test query",
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        # Should still get final response
+        assert response == "No tools were actually used."
+
+        # No tools should have been executed
+        assert tool_manager.calls == []
+
+        # Should make two API calls (initial + final)
+        assert mock_anthropic_client.messages.create.call_count == 2
+
+    @pytest.mark.parametrize(
+        "tool_calls, expected_api_calls",
+        [
+            # Two tool rounds, then the tool-free final call
+            (
+                [
+                    ("get_course_outline", {"course_name": "Test Course"}),
+                    ("search_course_content", {"query": "lesson 4 content"}),
+                ],
+                3,
+            ),
+            # One tool round, then Claude answers directly in round 2
+            ([("search_course_content", {"query": "test query"})], 2),
+        ],
+        ids=["two_rounds", "early_termination"],
+    )
+    def test_sequential_tool_calling_round_counts(
+        self,
+        mock_anthropic_client,
+        tool_manager,
+        generator,
+        tool_calls,
+        expected_api_calls,
+    ):
+        """Test API call and tool execution counts for each round sequence"""
+        tool_rounds = [
+            _tool_round(_tool_use(name, tool_input, f"tool_{i}"))
+            for i, (name, tool_input) in enumerate(tool_calls, 1)
+        ]
+        answer = SimpleNamespace(
+            stop_reason="end_turn", content=[_TextBlock("Final answer.")]
+        )
+
+        mock_anthropic_client.messages.create.side_effect = [*tool_rounds, answer]
+        generator.client = mock_anthropic_client
+
+        response = generator.generate_response(
+            "Find lesson 4 content from Test Course",
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        assert response == "Final answer."
+        assert mock_anthropic_client.messages.create.call_count == expected_api_calls
+
+        # Tools run once each, in round order
+        assert tool_manager.calls == tool_calls
+
+    def test_sequential_tool_calling_tool_failure_stops_rounds(
+        self, mock_anthropic_client, tool_manager, generator
+    ):
+        """Test that tool execution failure stops sequential rounds"""
+        # Round 1: AI makes tool call that fails
+        round1_response = Mock()
+        round1_response.stop_reason = "tool_use"
+        round1_response.content = [
+            _tool_use("search_course_content", {"query": "test query"}, "tool_1")
+        ]
+
+        # Final response after tool failure
+        final_response = SimpleNamespace(
+            stop_reason="end_turn",
+            content=[_TextBlock("I encountered an error while searching.")],
+        )
+
+        # Make tool execution fail
+        tool_manager.result = Exception("Tool failed")
+
+        mock_anthropic_client.messages.create.side_effect = [
+            round1_response,
+            final_response,
+        ]
+
+        generator.client = mock_anthropic_client
+
+        # Execute
+        response = generator.generate_response(
+            "Search for something",
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        # Assert
+        assert response == "I encountered an error while searching."
+
+        # Verify tool was attempted once
+        assert len(tool_manager.calls) == 1
+
+        # Verify 2 API calls were made (round1 + final after failure)
+        assert mock_anthropic_client.messages.create.call_count == 2
+
+        # Verify error was passed to Claude in tool result
+        final_call_args = mock_anthropic_client.messages.create.call_args_list[1][1]
+        tool_result_message = final_call_args["messages"][-1]
+        assert tool_result_message["role"] == "user"
+        assert (
+            "Error: Tool execution failed"
+            in tool_result_message["content"][0]["content"]
+        )
+
+    def test_tool_failure_still_answers_every_call(
+        self, mock_anthropic_client, tool_manager, generator
+    ):
+        """Test a failed call doesn't leave later tool_use blocks unanswered"""
+
+        def flaky(name, **kwargs):
+            if name == "search_course_content":
+                raise Exception("Tool failed")
+            return f"{name} result"
+
+        tool_manager.result = flaky
+        mock_anthropic_client.messages.create.side_effect = [
+            _tool_round(
+                _tool_use("search_course_content", {"query": "q"}, "tool_1"),
+                _tool_use("get_course_outline", {"course_name": "MCP"}, "tool_2"),
+            ),
+            SimpleNamespace(stop_reason="end_turn", content=[_TextBlock("Partial.")]),
+        ]
+
+        generator.client = mock_anthropic_client
+
+        response = generator.generate_response(
+            "What is MCP?",
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        assert response == "Partial."
+        final_call = mock_anthropic_client.messages.create.call_args_list[1][1]
+        # The failure stops further rounds, so the second call has no tools
+        assert "tools" not in final_call
+        assert final_call["messages"][-1]["content"] == [
+            {
+                "type": "tool_result",
+                "tool_use_id": "tool_1",
+                "content": "Error: Tool execution failed - Tool failed",
+            },
+            {
+                "type": "tool_result",
+                "tool_use_id": "tool_2",
+                "content": "get_course_outline result",
+            },
+        ]
+
+    def test_generate_response_async_parallel_tools(self, tool_manager, generator):
+        """Test that the async path runs all tool calls and keeps their order"""
+        mock_client = Mock()
+        mock_client.messages.create = AsyncMock()
+
+        tool1 = _tool_use("search_course_content", {"query": "first query"}, "tool_123")
+
+        tool2 = _tool_use(
+            "get_course_outline", {"course_name": "Test Course"}, "tool_456"
+        )
+
+        initial_response = _tool_round(tool1, tool2)
+
+        final_response = SimpleNamespace(
+            stop_reason="end_turn", content=[_TextBlock("Async answer.")]
+        )
+
+        mock_client.messages.create.side_effect = [initial_response, final_response]
+        tool_manager.result = lambda name, **kwargs: f"{name} result"
+
+        generator.async_client = mock_client
+
+        response = asyncio.run(
+            generator.generate_response_async(
+                "Tell me about the course",
+                tools=tool_manager.get_tool_definitions(),
+                tool_manager=tool_manager,
             )
+        )
+
+        assert response == "Async answer."
+        assert len(tool_manager.calls) == 2
+
+        final_call_args = mock_client.messages.create.call_args_list[1][1]
+        tool_results = final_call_args["messages"][2]["content"]
+        assert [r["tool_use_id"] for r in tool_results] == ["tool_123", "tool_456"]
+        assert [r["content"] for r in tool_results] == [
+            "search_course_content result",
+            "get_course_outline result",
+        ]
+
+    def test_duplicate_tool_calls_executed_once(self, tool_manager, generator):
+        """Test that identical tool calls in one round share a single execution"""
+        tool1 = _tool_use(
+            "search_course_content", {"query": "mcp", "lesson_number": 1}, "tool_123"
+        )
+
+        tool2 = _tool_use(
+            "search_course_content", {"lesson_number": 1, "query": "mcp"}, "tool_456"
+        )
+
+        initial_response = SimpleNamespace(
+            stop_reason="end_turn", content=[tool1, tool2]
+        )
+
+        tool_manager.result = "Search result"
+
+        sync_messages, _ = generator._handle_tool_execution(
+            initial_response, [], tool_manager
+        )
+        async_messages, _ = asyncio.run(
+            generator._handle_tool_execution_async(initial_response, [], tool_manager)
+        )
+
+        # One execution per path, both tool_use ids answered
+        assert len(tool_manager.calls) == 2
+        for messages in (sync_messages, async_messages):
+            tool_results = messages[1]["content"]
+            assert [r["tool_use_id"] for r in tool_results] == [
+                "tool_123",
+                "tool_456",
+            ]
+            assert [r["content"] for r in tool_results] == ["Search result"] * 2
 
-            # Should still get final response
-            assert response == "No tools were actually used."
-
-            # No tools should have been executed
-            mock_tool_manager.execute_tool.assert_not_called()
-
-            # Should make two API calls (initial + final)
-            assert mock_client.messages.create.call_count == 2
-
-    def test_sequential_tool_calling_two_rounds(self, mock_tool_manager):
-        """Test sequential tool calling over 2 rounds"""
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_client = Mock()
-            mock_anthropic.return_value = mock_client
-
-            # Round 1: AI makes first tool call
-            round1_response = Mock()
-            round1_response.stop_reason = "tool_use"
-            round1_response.content = [Mock()]
-            round1_response.content[0].type = "tool_use"
-            round1_response.content[0].name = "get_course_outline"
-            round1_response.content[0].id = "tool_1"
-            round1_response.content[0].input = {"course_name": "Test Course"}
-
-            # Round 2: AI makes second tool call based on first results
-            round2_response = Mock()
-            round2_response.stop_reason = "tool_use"
-            round2_response.content = [Mock()]
-            round2_response.content[0].type = "tool_use"
-            round2_response.content[0].name = "search_course_content"
-            round2_response.content[0].id = "tool_2"
-            round2_response.content[0].input = {"query": "lesson 4 content"}
-
-            # Final response after 2 rounds
-            final_response = Mock()
-            final_response.content = [Mock()]
-            final_response.content[0].text = (
-                "Based on the course outline and lesson content, here's the answer."
-            )
+    def test_generate_response_async_tool_failure_stops_rounds(
+        self, tool_manager, generator
+    ):
+        """Test that a failing tool on the async path is reported and ends rounds"""
+        mock_client = Mock()
+        mock_client.messages.create = AsyncMock()
 
-            mock_client.messages.create.side_effect = [
-                round1_response,
-                round2_response,
-                final_response,
-            ]
+        round1_response = Mock()
+        round1_response.stop_reason = "tool_use"
+        round1_response.content = [
+            _tool_use("search_course_content", {"query": "test query"}, "tool_1")
+        ]
 
-            generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
+        final_response = SimpleNamespace(
+            stop_reason="end_turn",
+            content=[_TextBlock("I encountered an error while searching.")],
+        )
 
-            # Execute
-            response = generator.generate_response(
-                "Find lesson 4 content from Test Course",
-                tools=mock_tool_manager.get_tool_definitions(),
-                tool_manager=mock_tool_manager,
-            )
+        tool_manager.result = Exception("Tool failed")
+        mock_client.messages.create.side_effect = [round1_response, final_response]
 
-            # Assert
-            assert (
-                response
-                == "Based on the course outline and lesson content, here's the answer."
-            )
+        generator.async_client = mock_client
 
-            # Verify both tools were executed in sequence
-            assert mock_tool_manager.execute_tool.call_count == 2
-            mock_tool_manager.execute_tool.assert_any_call(
-                "get_course_outline", course_name="Test Course"
+        response = asyncio.run(
+            generator.generate_response_async(
+                "Search for something",
+                tools=tool_manager.get_tool_definitions(),
+                tool_manager=tool_manager,
             )
-            mock_tool_manager.execute_tool.assert_any_call(
-                "search_course_content", query="lesson 4 content"
+        )
+
+        assert response == "I encountered an error while searching."
+        assert mock_client.messages.create.call_count == 2
+
+        final_call_args = mock_client.messages.create.call_args_list[1][1]
+        assert "tools" not in final_call_args
+        tool_result = final_call_args["messages"][-1]["content"][0]
+        assert tool_result["content"] == "Error: Tool execution failed - Tool failed"
+
+    def test_generate_response_stream_after_tools(self, tool_manager, generator):
+        """Test that the final answer is streamed after tool rounds complete"""
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock()
+
+        tool_response = Mock()
+        tool_response.stop_reason = "tool_use"
+        tool_response.content = [
+            _tool_use("search_course_content", {"query": "test query"}, "tool_1")
+        ]
+
+        mock_client.messages.create.side_effect = [tool_response, tool_response]
+        stream = mock_client.messages.stream.return_value.__aenter__.return_value
+        stream.text_stream = _text_stream("Streamed ", "answer.")
+
+        generator.async_client = mock_client
+
+        chunks = asyncio.run(
+            _collect(
+                generator.generate_response_stream(
+                    "What is in lesson 1?",
+                    tools=tool_manager.get_tool_definitions(),
+                    tool_manager=tool_manager,
+                )
             )
-
-            # Verify 3 API calls were made (round1 + round2 + final)
-            assert mock_client.messages.create.call_count == 3
-
-    def test_sequential_tool_calling_early_termination(self, mock_tool_manager):
-        """Test that sequential tool calling terminates early when AI doesn't use tools"""
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_client = Mock()
-            mock_anthropic.return_value = mock_client
-
-            # Round 1: AI makes tool call
-            round1_response = Mock()
-            round1_response.stop_reason = "tool_use"
-            round1_response.content = [Mock()]
-            round1_response.content[0].type = "tool_use"
-            round1_response.content[0].name = "search_course_content"
-            round1_response.content[0].id = "tool_1"
-            round1_response.content[0].input = {"query": "test query"}
-
-            # Round 2: AI provides direct answer without tool use
-            round2_response = Mock()
-            round2_response.stop_reason = "stop"
-            round2_response.content = [Mock()]
-            round2_response.content[0].text = (
-                "Here's the direct answer based on the search results."
+        )
+
+        assert chunks == ["Streamed ", "answer."]
+        assert mock_client.messages.create.call_count == 2
+        assert len(tool_manager.calls) == 2
+
+        # Final streamed call has no tools and sees both tool rounds
+        stream_args = mock_client.messages.stream.call_args[1]
+        assert "tools" not in stream_args
+        assert len(stream_args["messages"]) == 5
+
+    def test_generate_response_stream_direct_answer(self, tool_manager, generator):
+        """Test that a direct answer from a tool round is yielded without streaming"""
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock()
+
+        direct_response = SimpleNamespace(
+            stop_reason="end_turn", content=[_TextBlock("Direct answer.")]
+        )
+        mock_client.messages.create.return_value = direct_response
+
+        generator.async_client = mock_client
+
+        chunks = asyncio.run(
+            _collect(
+                generator.generate_response_stream(
+                    "What is AI?",
+                    tools=tool_manager.get_tool_definitions(),
+                    tool_manager=tool_manager,
+                )
             )
+        )
 
-            mock_client.messages.create.side_effect = [round1_response, round2_response]
+        assert chunks == ["Direct answer."]
+        mock_client.messages.stream.assert_not_called()
 
-            generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-
-            # Execute
-            response = generator.generate_response(
-                "What is in the course?",
-                tools=mock_tool_manager.get_tool_definitions(),
-                tool_manager=mock_tool_manager,
-            )
+    def test_generate_response_stream_redoes_capped_round(
+        self, tool_manager, generator
+    ):
+        """Test a direct answer cut off in round 1 is redone once, with tools"""
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock(
+            side_effect=[
+                SimpleNamespace(
+                    stop_reason="max_tokens", content=[_TextBlock("A long")]
+                ),
+                SimpleNamespace(
+                    stop_reason="end_turn", content=[_TextBlock("A long answer.")]
+                ),
+            ]
+        )
 
-            # Assert
-            assert response == "Here's the direct answer based on the search results."
+        generator.async_client = mock_client
 
-            # Verify only one tool was executed
-            assert mock_tool_manager.execute_tool.call_count == 1
-            mock_tool_manager.execute_tool.assert_called_with(
-                "search_course_content", query="test query"
+        chunks = asyncio.run(
+            _collect(
+                generator.generate_response_stream(
+                    "Explain MCP",
+                    tools=tool_manager.get_tool_definitions(),
+                    tool_manager=tool_manager,
+                )
             )
-
-            # Verify only 2 API calls were made (round1 + round2 with direct response)
-            assert mock_client.messages.create.call_count == 2
-
-    def test_sequential_tool_calling_tool_failure_stops_rounds(self, mock_tool_manager):
-        """Test that tool execution failure stops sequential rounds"""
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_client = Mock()
-            mock_anthropic.return_value = mock_client
-
-            # Round 1: AI makes tool call that fails
-            round1_response = Mock()
-            round1_response.stop_reason = "tool_use"
-            round1_response.content = [Mock()]
-            round1_response.content[0].type = "tool_use"
-            round1_response.content[0].name = "search_course_content"
-            round1_response.content[0].id = "tool_1"
-            round1_response.content[0].input = {"query": "test query"}
-
-            # Final response after tool failure
-            final_response = Mock()
-            final_response.content = [Mock()]
-            final_response.content[0].text = "I encountered an error while searching."
-
-            # Make tool execution fail
-            mock_tool_manager.execute_tool.side_effect = Exception("Tool failed")
-
-            mock_client.messages.create.side_effect = [round1_response, final_response]
-
-            generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-
-            # Execute
-            response = generator.generate_response(
-                "Search for something",
-                tools=mock_tool_manager.get_tool_definitions(),
-                tool_manager=mock_tool_manager,
+        )
+
+        assert chunks == ["A long answer."]
+        capped, redo = mock_client.messages.create.call_args_list
+        assert capped[1]["max_tokens"] == AIGenerator.TOOL_ROUND_MAX_TOKENS
+        assert redo[1]["max_tokens"] == 800
+        assert "tools" in redo[1]
+        mock_client.messages.stream.assert_not_called()
+
+    def test_generate_batch(self, mock_anthropic_client, generator):
+        """Test batch submission, polling and result mapping"""
+        pending = Mock(id="batch_1", processing_status="in_progress")
+        ended = Mock(id="batch_1", processing_status="ended")
+        mock_anthropic_client.messages.batches.create.return_value = pending
+        mock_anthropic_client.messages.batches.retrieve.return_value = ended
+
+        succeeded = Mock(custom_id="q-0")
+        succeeded.result.type = "succeeded"
+        succeeded.result.message.content = [_TextBlock("MCP is a protocol.")]
+        errored = Mock(custom_id="q-1")
+        errored.result.type = "errored"
+        mock_anthropic_client.messages.batches.results.return_value = [
+            succeeded,
+            errored,
+        ]
+
+        generator.client = mock_anthropic_client
+
+        tools = _FakeToolManager.TOOL_DEFINITIONS
+        results = generator.generate_batch(
+            ["What is MCP?", "What is RAG?"], tools=tools, poll_interval=0
+        )
+
+        assert results == {"q-0": "MCP is a protocol.", "q-1": None}
+
+        requests = mock_anthropic_client.messages.batches.create.call_args[1][
+            "requests"
+        ]
+        assert [r["custom_id"] for r in requests] == ["q-0", "q-1"]
+        params = requests[1]["params"]
+        assert params["model"] == "claude-sonnet-4-20250514"
+        assert params["max_tokens"] == 800
+        assert params["system"] == [AIGenerator.SYSTEM_BLOCK]
+        assert params["messages"] == [{"role": "user", "content": "What is RAG?"}]
+        # Same cache-marked tools as live queries, but they can't be called
+        assert params["tools"] == generator._prepare_prompt(None, tools)[1]
+        assert params["tool_choice"] == {"type": "none"}
+
+        assert mock_anthropic_client.messages.batches.retrieve.call_args_list == [
+            (("batch_1",), {})
+        ]
+        assert mock_anthropic_client.messages.batches.results.call_args_list == [
+            (("batch_1",), {})
+        ]
+
+    def test_generate_batch_times_out(self, mock_anthropic_client, generator):
+        """Test a batch that never ends raises once max_wait has passed"""
+        pending = Mock(id="batch_1", processing_status="in_progress")
+        mock_anthropic_client.messages.batches.create.return_value = pending
+        mock_anthropic_client.messages.batches.retrieve.return_value = pending
+
+        generator.client = mock_anthropic_client
+
+        with patch("ai_generator.time.monotonic", side_effect=[0.0, 5.0, 11.0]):
+            with pytest.raises(TimeoutError, match="batch_1"):
+                generator.generate_batch(["What is MCP?"], max_wait=10.0)
+
+        assert mock_anthropic_client.messages.batches.retrieve.call_count == 1
+        mock_anthropic_client.messages.batches.results.assert_not_called()
+
+
+@pytest.mark.unit
+class TestAIGeneratorTransport:
+    """AIGenerator against the real SDK, mocked at the httpx transport layer"""
+
+    def test_direct_answer_parsed_from_json(self, generator):
+        """Test a plain JSON response goes through the SDK's real parsing"""
+        transport, bodies = _replay_transport(_TEXT_RESPONSE)
+        generator.client = Anthropic(
+            api_key="test-api-key",
+            max_retries=0,
+            http_client=httpx.Client(transport=transport),
+        )
+
+        response = generator.generate_response("What is AI?")
+
+        assert response == "Transport answer."
+        assert bodies[0]["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert bodies[0]["messages"] == [{"role": "user", "content": "What is AI?"}]
+
+    def test_tool_round_serializes_sdk_blocks(self, generator, tool_manager):
+        """Test SDK tool_use blocks are echoed back as valid request JSON"""
+        transport, bodies = _replay_transport(_TOOL_USE_RESPONSE, _TEXT_RESPONSE)
+        generator.client = Anthropic(
+            api_key="test-api-key",
+            max_retries=0,
+            http_client=httpx.Client(transport=transport),
+        )
+
+        response = generator.generate_response(
+            "What is in lesson 1?",
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        assert response == "Transport answer."
+        assert tool_manager.calls == [
+            ("search_course_content", {"query": "test query"})
+        ]
+
+        assistant_turn, tool_turn = bodies[1]["messages"][1:]
+        assert assistant_turn["content"][0]["type"] == "tool_use"
+        assert assistant_turn["content"][0]["id"] == "tool_123"
+        assert tool_turn["content"][0] == {
+            "type": "tool_result",
+            "tool_use_id": "tool_123",
+            "content": "Mock search result",
+        }
+
+    def test_async_tool_round(self, generator, tool_manager):
+        """Test the async path end to end through the async SDK client"""
+        transport, bodies = _replay_transport(_TOOL_USE_RESPONSE, _TEXT_RESPONSE)
+        generator.async_client = AsyncAnthropic(
+            api_key="test-api-key",
+            max_retries=0,
+            http_client=httpx.AsyncClient(transport=transport),
+        )
+
+        response = asyncio.run(
+            generator.generate_response_async(
+                "What is in lesson 1?",
+                tools=tool_manager.get_tool_definitions(),
+                tool_manager=tool_manager,
             )
+        )
 
-            # Assert
-            assert response == "I encountered an error while searching."
-
-            # Verify tool was attempted once
-            assert mock_tool_manager.execute_tool.call_count == 1
-
-            # Verify 2 API calls were made (round1 + final after failure)
-            assert mock_client.messages.create.call_count == 2
-
-            # Verify error was passed to Claude in tool result
-            final_call_args = mock_client.messages.create.call_args_list[1][1]
-            tool_result_message = final_call_args["messages"][-1]
-            assert tool_result_message["role"] == "user"
-            assert (
-                "Error: Tool execution failed"
-                in tool_result_message["content"][0]["content"]
-            )
+        assert response == "Transport answer."
+        assert len(bodies) == 2
+        assert bodies[0]["max_tokens"] == AIGenerator.TOOL_ROUND_MAX_TOKENS
+        assert bodies[1]["max_tokens"] == 800
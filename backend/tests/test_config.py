@@ -148,6 +148,23 @@ class TestConfig:
         assert isinstance(test_config.CHUNK_OVERLAP, int)
         assert isinstance(test_config.MAX_RESULTS, int)
         assert isinstance(test_config.MAX_HISTORY, int)
+        assert isinstance(test_config.MAX_RETRIES, int)
+
+        # Float values
+        assert isinstance(test_config.REQUEST_TIMEOUT, float)
+
+    def test_config_api_timeout_settings(self):
+        """Test Anthropic request timeout and retry settings"""
+        test_config = Config()
+
+        assert test_config.REQUEST_TIMEOUT > 0
+        assert test_config.MAX_RETRIES >= 0
+
+    def test_config_skip_round2_disabled_by_default(self):
+        """Test the early-answer heuristic is opt-in"""
+        test_config = Config()
+
+        assert test_config.SKIP_ROUND2_WHEN_TEXT_PRESENT is False
 
     def test_config_validation_logic(self):
         """Test configuration validation (what should be implemented)"""
@@ -7,21 +7,38 @@ import pytest
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from search_tools import CourseSearchTool
-from vector_store import SearchResults
+from ai_generator import AIGenerator
+from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
+
+
+@pytest.fixture
+def tool(mock_vector_store):
+    """CourseSearchTool over the shared mock vector store"""
+    return CourseSearchTool(mock_vector_store)
 
 
 class TestCourseSearchTool:
     """Test cases for CourseSearchTool"""
 
-    def test_execute_successful_search(self, mock_vector_store, sample_search_results):
-        """Test successful search with results"""
+    @pytest.mark.parametrize(
+        "filters",
+        [
+            {},
+            {"course_name": "Anthropic Course"},
+            {"lesson_number": 2},
+            {"course_name": "Anthropic Course", "lesson_number": 1},
+        ],
+        ids=["no_filter", "course_filter", "lesson_filter", "both_filters"],
+    )
+    def test_execute_successful_search(
+        self, mock_vector_store, tool, sample_search_results, filters
+    ):
+        """Test successful search with results, with and without filters"""
         # Setup
         mock_vector_store.search.return_value = sample_search_results
-        tool = CourseSearchTool(mock_vector_store)
 
         # Execute
-        result = tool.execute("test query")
+        result = tool.execute("test query", **filters)
 
         # Assert
         assert "[Building Towards Computer Use with Anthropic - Lesson 1]" in result
@@ -29,77 +46,31 @@ class TestCourseSearchTool:
         assert "Welcome to Building Toward Computer Use" in result
         assert "advanced topics including tool calling" in result
 
-        # Verify vector store was called correctly
-        mock_vector_store.search.assert_called_once_with(
-            query="test query", course_name=None, lesson_number=None
-        )
-
-    def test_execute_with_course_filter(self, mock_vector_store, sample_search_results):
-        """Test search with course name filter"""
-        # Setup
-        mock_vector_store.search.return_value = sample_search_results
-        tool = CourseSearchTool(mock_vector_store)
-
-        # Execute
-        result = tool.execute("test query", course_name="Anthropic Course")
-
-        # Assert
-        assert "Building Towards Computer Use" in result
-        mock_vector_store.search.assert_called_once_with(
-            query="test query", course_name="Anthropic Course", lesson_number=None
-        )
-
-    def test_execute_with_lesson_filter(self, mock_vector_store, sample_search_results):
-        """Test search with lesson number filter"""
-        # Setup
-        mock_vector_store.search.return_value = sample_search_results
-        tool = CourseSearchTool(mock_vector_store)
-
-        # Execute
-        result = tool.execute("test query", lesson_number=2)
-
-        # Assert
-        assert "Building Towards Computer Use" in result
-        mock_vector_store.search.assert_called_once_with(
-            query="test query", course_name=None, lesson_number=2
-        )
-
-    def test_execute_with_both_filters(self, mock_vector_store, sample_search_results):
-        """Test search with both course and lesson filters"""
-        # Setup
-        mock_vector_store.search.return_value = sample_search_results
-        tool = CourseSearchTool(mock_vector_store)
-
-        # Execute
-        result = tool.execute(
-            "test query", course_name="Anthropic Course", lesson_number=1
-        )
-
-        # Assert
-        assert "Building Towards Computer Use" in result
+        # Verify filters are passed through to the vector store
         mock_vector_store.search.assert_called_once_with(
-            query="test query", course_name="Anthropic Course", lesson_number=1
+            query="test query",
+            course_name=filters.get("course_name"),
+            lesson_number=filters.get("lesson_number"),
         )
 
-    def test_execute_empty_results(self, mock_vector_store, empty_search_results):
+    def test_execute_empty_results(self, mock_vector_store, tool, empty_search_results):
         """Test handling of empty search results"""
         # Setup
         mock_vector_store.search.return_value = empty_search_results
-        tool = CourseSearchTool(mock_vector_store)
 
         # Execute
         result = tool.execute("nonexistent query")
 
         # Assert
         assert result == "No relevant content found."
+        assert result.startswith(AIGenerator.EMPTY_RESULT_PREFIXES)
 
     def test_execute_empty_results_with_filters(
-        self, mock_vector_store, empty_search_results
+        self, mock_vector_store, tool, empty_search_results
     ):
         """Test empty results with filter information"""
         # Setup
         mock_vector_store.search.return_value = empty_search_results
-        tool = CourseSearchTool(mock_vector_store)
 
         # Execute
         result = tool.execute(
@@ -110,11 +81,10 @@ class TestCourseSearchTool:
         expected = "No relevant content found in course 'Missing Course' in lesson 5."
         assert result == expected
 
-    def test_execute_search_error(self, mock_vector_store, error_search_results):
+    def test_execute_search_error(self, mock_vector_store, tool, error_search_results):
         """Test handling of search errors"""
         # Setup
         mock_vector_store.search.return_value = error_search_results
-        tool = CourseSearchTool(mock_vector_store)
 
         # Execute
         result = tool.execute("test query")
@@ -122,12 +92,13 @@ class TestCourseSearchTool:
         # Assert
         assert result == "Search error: Database connection failed"
 
-    def test_execute_max_results_zero_issue(self, mock_vector_store):
+        # Callers can tell the error apart from real results
+        assert tool.execute_with_sources("test query").failed
+
+    def test_execute_max_results_zero_issue(self, tool, make_search_results):
         """Test the critical MAX_RESULTS=0 issue"""
         # Setup - simulate the behavior when MAX_RESULTS=0 causes no results
-        empty_results = SearchResults(documents=[], metadata=[], distances=[])
-        mock_vector_store.search.return_value = empty_results
-        tool = CourseSearchTool(mock_vector_store)
+        make_search_results([], [])
 
         # Execute
         result = tool.execute("valid query about course content")
@@ -138,21 +109,17 @@ class TestCourseSearchTool:
         # This test demonstrates the bug: even with valid queries, we get no results
         # when MAX_RESULTS=0 because the vector store returns empty results
 
-    def test_format_results_with_lesson_links(self, mock_vector_store):
+    def test_format_results_with_lesson_links(
+        self, mock_vector_store, tool, make_search_results
+    ):
         """Test that lesson links are properly retrieved and stored"""
         # Setup
-        search_results = SearchResults(
-            documents=["Test content"],
-            metadata=[
-                {"course_title": "Test Course", "lesson_number": 1, "chunk_index": 0}
-            ],
-            distances=[0.1],
+        make_search_results(
+            ["Test content"],
+            [{"course_title": "Test Course", "lesson_number": 1, "chunk_index": 0}],
         )
-        mock_vector_store.search.return_value = search_results
         mock_vector_store.get_lesson_link.return_value = "https://example.com/lesson1"
 
-        tool = CourseSearchTool(mock_vector_store)
-
         # Execute
         result = tool.execute("test query")
 
@@ -167,19 +134,12 @@ class TestCourseSearchTool:
         assert tool.last_sources == ["Test Course - Lesson 1"]
         assert tool.last_source_links == ["https://example.com/lesson1"]
 
-    def test_format_results_without_lesson_number(self, mock_vector_store):
+    def test_format_results_without_lesson_number(self, tool, make_search_results):
         """Test formatting when lesson_number is None"""
-        # Setup
-        search_results = SearchResults(
-            documents=["Test content"],
-            metadata=[
-                {"course_title": "Test Course", "chunk_index": 0}
-            ],  # No lesson_number
-            distances=[0.1],
+        # Setup - no lesson_number in the metadata
+        make_search_results(
+            ["Test content"], [{"course_title": "Test Course", "chunk_index": 0}]
         )
-        mock_vector_store.search.return_value = search_results
-
-        tool = CourseSearchTool(mock_vector_store)
 
         # Execute
         result = tool.execute("test query")
@@ -192,11 +152,8 @@ class TestCourseSearchTool:
         assert tool.last_sources == ["Test Course"]
         assert tool.last_source_links == [None]
 
-    def test_get_tool_definition(self, mock_vector_store):
+    def test_get_tool_definition(self, tool):
         """Test that tool definition is properly structured"""
-        # Setup
-        tool = CourseSearchTool(mock_vector_store)
-
         # Execute
         definition = tool.get_tool_definition()
 
@@ -212,10 +169,11 @@ class TestCourseSearchTool:
         assert "lesson_number" in schema["properties"]
         assert schema["required"] == ["query"]
 
-    def test_source_tracking_reset(self, mock_vector_store, sample_search_results):
+    def test_source_tracking_reset(
+        self, mock_vector_store, tool, sample_search_results, make_search_results
+    ):
         """Test that sources are properly tracked and can be reset"""
         # Setup
-        tool = CourseSearchTool(mock_vector_store)
         mock_vector_store.search.return_value = sample_search_results
 
         # Execute first search
@@ -228,38 +186,37 @@ class TestCourseSearchTool:
         assert len(first_links) > 0
 
         # Execute second search with empty results
-        mock_vector_store.search.return_value = SearchResults([], [], [])
+        make_search_results([], [])
         tool.execute("second query")
 
         # Verify sources are cleared for empty results
         assert tool.last_sources == []
         assert tool.last_source_links == []
 
-    def test_multiple_documents_formatting(self, mock_vector_store):
+    def test_multiple_documents_formatting(
+        self, mock_vector_store, tool, make_search_results
+    ):
         """Test formatting when multiple documents are returned"""
         # Setup
-        multi_results = SearchResults(
-            documents=[
+        make_search_results(
+            [
                 "First document content about AI",
                 "Second document about machine learning",
                 "Third document about computer vision",
             ],
-            metadata=[
+            [
                 {"course_title": "AI Course", "lesson_number": 1, "chunk_index": 0},
                 {"course_title": "AI Course", "lesson_number": 2, "chunk_index": 1},
                 {"course_title": "ML Course", "lesson_number": 1, "chunk_index": 0},
             ],
             distances=[0.1, 0.2, 0.3],
         )
-        mock_vector_store.search.return_value = multi_results
         mock_vector_store.get_lesson_link.side_effect = [
             "https://example.com/ai1",
             "https://example.com/ai2",
             "https://example.com/ml1",
         ]
 
-        tool = CourseSearchTool(mock_vector_store)
-
         # Execute
         result = tool.execute("test query")
 
@@ -285,3 +242,32 @@ class TestCourseSearchTool:
 
         assert tool.last_sources == expected_sources
         assert tool.last_source_links == expected_links
+
+
+class TestToolManager:
+    """Test cases for ToolManager"""
+
+    def test_tool_definitions_built_once(self, mock_vector_store):
+        """Test that definitions are reused until a new tool is registered"""
+        manager = ToolManager()
+        search_tool = CourseSearchTool(mock_vector_store)
+        manager.register_tool(search_tool)
+
+        with patch.object(
+            search_tool,
+            "get_tool_definition",
+            wraps=search_tool.get_tool_definition,
+        ) as get_definition:
+            first = manager.get_tool_definitions()
+            second = manager.get_tool_definitions()
+
+            assert second is first
+            assert get_definition.call_count == 1
+
+        manager.register_tool(CourseOutlineTool(mock_vector_store))
+        definitions = manager.get_tool_definitions()
+
+        assert [d["name"] for d in definitions] == [
+            "search_course_content",
+            "get_course_outline",
+        ]
@@ -1,7 +1,8 @@
+import asyncio
 import os
 import sys
 import tempfile
-from unittest.mock import MagicMock, Mock, patch
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
 import pytest
 
@@ -10,6 +11,24 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models import Course, CourseChunk, Lesson
 from rag_system import RAGSystem
+from search_tools import ToolResult
+
+
+def _stub_tool_sources(rag_system, sources, source_links):
+    """Make every tool call report the given sources"""
+    rag_system.tool_manager.execute_tool_with_sources = Mock(
+        return_value=ToolResult("Search result", sources, source_links)
+    )
+
+
+def _search_then(answer):
+    """AI generator stand-in that runs one search before answering"""
+
+    def generate(**kwargs):
+        kwargs["tool_manager"].execute_tool("search_course_content", query="q")
+        return answer
+
+    return generate
 
 
 class TestRAGSystem:
@@ -64,7 +83,7 @@ class TestRAGSystem:
         ):
 
             # Setup mocks
-            mock_ai_gen.return_value.generate_response.return_value = (
+            mock_ai_gen.return_value.generate_response.side_effect = _search_then(
                 "Based on the course content, here's the answer."
             )
             mock_session.return_value.get_conversation_history.return_value = None
@@ -72,11 +91,8 @@ class TestRAGSystem:
             rag_system = RAGSystem(test_config)
 
             # Mock tool manager to return sources
-            rag_system.tool_manager.get_last_sources = Mock(
-                return_value=["Course 1 - Lesson 1"]
-            )
-            rag_system.tool_manager.get_last_source_links = Mock(
-                return_value=["https://example.com/lesson1"]
+            _stub_tool_sources(
+                rag_system, ["Course 1 - Lesson 1"], ["https://example.com/lesson1"]
             )
 
             # Execute query
@@ -113,8 +129,6 @@ class TestRAGSystem:
             )
 
             rag_system = RAGSystem(test_config)
-            rag_system.tool_manager.get_last_sources = Mock(return_value=[])
-            rag_system.tool_manager.get_last_source_links = Mock(return_value=[])
 
             # Execute query with session
             response, sources, source_links = rag_system.query(
@@ -158,10 +172,6 @@ class TestRAGSystem:
 
             rag_system = RAGSystem(broken_config)
 
-            # Mock tool manager to simulate no results found (due to MAX_RESULTS=0)
-            rag_system.tool_manager.get_last_sources = Mock(return_value=[])
-            rag_system.tool_manager.get_last_source_links = Mock(return_value=[])
-
             # Execute query that should find content but doesn't due to config issue
             response, sources, source_links = rag_system.query(
                 "What is covered in the course?"
@@ -188,8 +198,6 @@ class TestRAGSystem:
             )
 
             rag_system = RAGSystem(test_config)
-            rag_system.tool_manager.get_last_sources = Mock(return_value=[])
-            rag_system.tool_manager.get_last_source_links = Mock(return_value=[])
 
             # Execute query without session
             response, sources, source_links = rag_system.query("What is AI?")
@@ -201,6 +209,167 @@ class TestRAGSystem:
             mock_session.return_value.get_conversation_history.assert_not_called()
             mock_session.return_value.add_exchange.assert_not_called()
 
+    def test_query_async(self, test_config):
+        """Test async query processing awaits the async AI generator"""
+        with (
+            patch("rag_system.DocumentProcessor"),
+            patch("rag_system.VectorStore"),
+            patch("rag_system.AIGenerator") as mock_ai_gen,
+            patch("rag_system.SessionManager") as mock_session,
+        ):
+
+            mock_ai_gen.return_value.generate_response_async = AsyncMock(
+                side_effect=_search_then("Async response.")
+            )
+            mock_session.return_value.get_conversation_history.return_value = None
+
+            rag_system = RAGSystem(test_config)
+            _stub_tool_sources(rag_system, ["Source 1"], ["Link 1"])
+
+            response, sources, source_links = asyncio.run(
+                rag_system.query_async("What is AI?", session_id="session123")
+            )
+
+            assert response == "Async response."
+            assert sources == ["Source 1"]
+            assert source_links == ["Link 1"]
+
+            mock_ai_gen.return_value.generate_response.assert_not_called()
+            mock_session.return_value.add_exchange.assert_called_once_with(
+                "session123", "What is AI?", "Async response."
+            )
+
+    def test_query_stream(self, test_config):
+        """Test streamed query yields text events then sources"""
+
+        async def fake_stream(**kwargs):
+            kwargs["tool_manager"].execute_tool("search_course_content", query="q")
+            for chunk in ("Streamed ", "response."):
+                yield chunk
+
+        async def collect(stream):
+            return [event async for event in stream]
+
+        with (
+            patch("rag_system.DocumentProcessor"),
+            patch("rag_system.VectorStore"),
+            patch("rag_system.AIGenerator") as mock_ai_gen,
+            patch("rag_system.SessionManager") as mock_session,
+        ):
+
+            mock_ai_gen.return_value.generate_response_stream = fake_stream
+            mock_session.return_value.get_conversation_history.return_value = None
+
+            rag_system = RAGSystem(test_config)
+            _stub_tool_sources(rag_system, ["Source 1"], ["Link 1"])
+
+            events = asyncio.run(
+                collect(rag_system.query_stream("What is AI?", session_id="s1"))
+            )
+
+            assert events == [
+                {"type": "text", "text": "Streamed "},
+                {"type": "text", "text": "response."},
+                {"type": "done", "sources": ["Source 1"], "source_links": ["Link 1"]},
+            ]
+
+            # Full response is recorded once streaming completes
+            mock_session.return_value.add_exchange.assert_called_once_with(
+                "s1", "What is AI?", "Streamed response."
+            )
+
+    def test_query_batch(self, test_config):
+        """Test batched queries use the live prompt and tool definitions"""
+        with (
+            patch("rag_system.DocumentProcessor"),
+            patch("rag_system.VectorStore"),
+            patch("rag_system.AIGenerator") as mock_ai_gen,
+            patch("rag_system.SessionManager") as mock_session,
+        ):
+
+            mock_ai_gen.return_value.generate_batch.return_value = {"q-0": "MCP."}
+
+            rag_system = RAGSystem(test_config)
+            results = rag_system.query_batch(["What is MCP?"])
+
+            assert results == {"q-0": "MCP."}
+            mock_ai_gen.return_value.generate_batch.assert_called_once_with(
+                ["Answer this question about course materials: What is MCP?"],
+                tools=rag_system.tool_manager.get_tool_definitions(),
+            )
+            mock_session.return_value.add_exchange.assert_not_called()
+
+    def test_repeat_query_served_from_cache(self, test_config):
+        """Test an exact repeat query skips the AI generator until data changes"""
+        with (
+            patch("rag_system.DocumentProcessor"),
+            patch("rag_system.VectorStore"),
+            patch("rag_system.AIGenerator") as mock_ai_gen,
+            patch("rag_system.SessionManager") as mock_session,
+        ):
+
+            mock_ai_gen.return_value.generate_response.side_effect = _search_then(
+                "MCP answer."
+            )
+            mock_session.return_value.get_conversation_history.return_value = None
+
+            rag_system = RAGSystem(test_config)
+            _stub_tool_sources(rag_system, ["Source 1"], ["Link 1"])
+
+            first = rag_system.query("What is MCP?", session_id="s1")
+            second = rag_system.query("  what is   MCP? ", session_id="s1")
+
+            assert first == second == ("MCP answer.", ["Source 1"], ["Link 1"])
+            assert mock_ai_gen.return_value.generate_response.call_count == 1
+            # Cached answers still go into the conversation history
+            assert mock_session.return_value.add_exchange.call_count == 2
+
+            rag_system.add_course_folder("/nonexistent", clear_existing=True)
+            rag_system.query("What is MCP?")
+
+            assert mock_ai_gen.return_value.generate_response.call_count == 2
+
+    @pytest.mark.parametrize(
+        "tool_error",
+        [
+            ToolResult("Search error: connection reset", [], [], failed=True),
+            Exception("Chroma unavailable"),
+        ],
+        ids=["error_result", "raised"],
+    )
+    def test_answer_after_tool_failure_not_cached(self, test_config, tool_error):
+        """Test answers written around a failed tool call are not cached"""
+        with (
+            patch("rag_system.DocumentProcessor"),
+            patch("rag_system.VectorStore"),
+            patch("rag_system.AIGenerator") as mock_ai_gen,
+            patch("rag_system.SessionManager"),
+        ):
+
+            def generate(**kwargs):
+                # The AI generator reports raised tool errors back to Claude
+                try:
+                    kwargs["tool_manager"].execute_tool(
+                        "search_course_content", query="q"
+                    )
+                except Exception:
+                    pass
+                return "Search is unavailable right now."
+
+            mock_ai_gen.return_value.generate_response.side_effect = generate
+
+            rag_system = RAGSystem(test_config)
+            rag_system.tool_manager.execute_tool_with_sources = Mock(
+                side_effect=[tool_error, ToolResult("Search result", ["S"], [None])]
+            )
+
+            rag_system.query("What is MCP?")
+            second = rag_system.query("What is MCP?")
+
+            # The repeat query is generated again once the tool recovers
+            assert mock_ai_gen.return_value.generate_response.call_count == 2
+            assert second == ("Search is unavailable right now.", ["S"], [None])
+
     def test_add_course_document_success(self, test_config, sample_course):
         """Test adding a single course document"""
         with (
@@ -460,8 +629,8 @@ class TestRAGSystem:
             assert "search_course_content" in tool_names
             assert "get_course_outline" in tool_names
 
-    def test_source_tracking_and_reset(self, test_config):
-        """Test that sources are properly tracked and reset after queries"""
+    def test_sources_kept_per_request(self, test_config):
+        """Test each query reports only the sources its own tool calls found"""
         with (
             patch("rag_system.DocumentProcessor"),
             patch("rag_system.VectorStore"),
@@ -469,16 +638,12 @@ class TestRAGSystem:
             patch("rag_system.SessionManager"),
         ):
 
-            mock_ai_gen.return_value.generate_response.return_value = "Test response"
+            mock_ai_gen.return_value.generate_response.side_effect = _search_then(
+                "Test response"
+            )
 
             rag_system = RAGSystem(test_config)
-
-            # Mock tool manager methods
-            rag_system.tool_manager.get_last_sources = Mock(return_value=["Source 1"])
-            rag_system.tool_manager.get_last_source_links = Mock(
-                return_value=["Link 1"]
-            )
-            rag_system.tool_manager.reset_sources = Mock()
+            _stub_tool_sources(rag_system, ["Source 1"], ["Link 1"])
 
             # Execute query
             response, sources, source_links = rag_system.query("Test query")
@@ -487,8 +652,45 @@ class TestRAGSystem:
             assert sources == ["Source 1"]
             assert source_links == ["Link 1"]
 
-            # Verify sources were reset after retrieval
-            rag_system.tool_manager.reset_sources.assert_called_once()
+            # A later query that makes no tool calls doesn't inherit them
+            mock_ai_gen.return_value.generate_response.side_effect = None
+            mock_ai_gen.return_value.generate_response.return_value = "Direct"
+            assert rag_system.query("Other query") == ("Direct", [], [])
+
+    def test_concurrent_queries_keep_own_sources(self, test_config):
+        """Test overlapping async queries don't read each other's sources"""
+        with (
+            patch("rag_system.DocumentProcessor"),
+            patch("rag_system.VectorStore"),
+            patch("rag_system.AIGenerator") as mock_ai_gen,
+            patch("rag_system.SessionManager"),
+        ):
+
+            async def generate(**kwargs):
+                query = kwargs["query"].rsplit(": ", 1)[1]
+                kwargs["tool_manager"].execute_tool(
+                    "search_course_content", query=query
+                )
+                # Let the other request run its search before answering
+                await asyncio.sleep(0)
+                return f"Answer {query}"
+
+            mock_ai_gen.return_value.generate_response_async = generate
+
+            rag_system = RAGSystem(test_config)
+            rag_system.tool_manager.execute_tool_with_sources = Mock(
+                side_effect=lambda name, query: ToolResult("Result", [query], [None])
+            )
+
+            async def run_both():
+                return await asyncio.gather(
+                    rag_system.query_async("A"), rag_system.query_async("B")
+                )
+
+            first, second = asyncio.run(run_both())
+
+            assert first == ("Answer A", ["A"], [None])
+            assert second == ("Answer B", ["B"], [None])
 
     def test_end_to_end_query_flow_integration(self, test_config):
         """Test complete end-to-end query processing flow"""
@@ -502,16 +704,15 @@ class TestRAGSystem:
             # Setup comprehensive mocks
             mock_session.return_value.create_session.return_value = "new_session_123"
             mock_session.return_value.get_conversation_history.return_value = None
-            mock_ai_gen.return_value.generate_response.return_value = (
+            mock_ai_gen.return_value.generate_response.side_effect = _search_then(
                 "Comprehensive answer based on course materials."
             )
 
             rag_system = RAGSystem(test_config)
-            rag_system.tool_manager.get_last_sources = Mock(
-                return_value=["Complete Course - Lesson 5"]
-            )
-            rag_system.tool_manager.get_last_source_links = Mock(
-                return_value=["https://example.com/lesson5"]
+            _stub_tool_sources(
+                rag_system,
+                ["Complete Course - Lesson 5"],
+                ["https://example.com/lesson5"],
             )
 
             # Execute complete flow
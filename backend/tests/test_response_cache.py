@@ -0,0 +1,65 @@
+import os
+import sys
+from unittest.mock import patch
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import ResponseCache
+
+
+class TestResponseCache:
+    """Test cases for the repeat-query ResponseCache"""
+
+    def test_key_normalizes_query(self):
+        """Test that case and whitespace don't change the cache key"""
+        key = ResponseCache.make_key("What is MCP?")
+
+        assert ResponseCache.make_key("  what IS  mcp? ") == key
+        assert ResponseCache.make_key("What is RAG?") != key
+
+    def test_key_depends_on_history(self):
+        """Test that the same query in a different conversation is a new key"""
+        key = ResponseCache.make_key("Tell me more", "User: What is MCP?")
+
+        assert ResponseCache.make_key("Tell me more") != key
+        assert ResponseCache.make_key("Tell me more", "User: What is RAG?") != key
+
+    def test_get_and_set(self):
+        """Test storing and reading back an answer"""
+        cache = ResponseCache()
+        key = ResponseCache.make_key("What is MCP?")
+        answer = ("MCP is a protocol.", ["Course A"], ["https://example.com"])
+
+        assert cache.get(key) is None
+        cache.set(key, answer)
+        assert cache.get(key) == answer
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest unused entry is dropped when full"""
+        cache = ResponseCache(max_size=2)
+        cache.set(b"a", ("A", [], []))
+        cache.set(b"b", ("B", [], []))
+        cache.get(b"a")
+        cache.set(b"c", ("C", [], []))
+
+        assert len(cache) == 2
+        assert cache.get(b"b") is None
+        assert cache.get(b"a") == ("A", [], [])
+
+    def test_entries_expire(self):
+        """Test that answers older than the TTL are not returned"""
+        cache = ResponseCache(ttl=600.0)
+        with patch("response_cache.time.monotonic", return_value=1000.0):
+            cache.set(b"a", ("A", [], []))
+        with patch("response_cache.time.monotonic", return_value=1601.0):
+            assert cache.get(b"a") is None
+        assert len(cache) == 0
+
+    def test_clear(self):
+        """Test that clear drops every entry"""
+        cache = ResponseCache()
+        cache.set(b"a", ("A", [], []))
+        cache.clear()
+
+        assert cache.get(b"a") is None
@@ -75,8 +75,11 @@ async function sendMessage() {
     chatMessages.appendChild(loadingMessage);
     chatMessages.scrollTop = chatMessages.scrollHeight;
 
+    // Partly streamed answer, if any text has arrived yet
+    let streamingMessage = null;
+
     try {
-        const response = await fetch(`${API_URL}/query`, {
+        const response = await fetch(`${API_URL}/query/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -89,20 +92,36 @@ async function sendMessage() {
 
         if (!response.ok) throw new Error('Query failed');
 
-        const data = await response.json();
-        
-        // Update session ID if new
-        if (!currentSessionId) {
-            currentSessionId = data.session_id;
-        }
+        // Show the answer as it streams in, then redraw it with its sources
+        let answer = '';
+        await readServerEvents(response, (event) => {
+            if (event.type === 'text') {
+                answer += event.text;
+                if (!streamingMessage) {
+                    loadingMessage.remove();
+                    streamingMessage = createStreamingMessage();
+                    chatMessages.appendChild(streamingMessage);
+                }
+                streamingMessage.firstElementChild.innerHTML = marked.parse(answer);
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+            } else if (event.type === 'done') {
+                // Update session ID if new
+                if (!currentSessionId) {
+                    currentSessionId = event.session_id;
+                }
 
-        // Replace loading message with response
-        loadingMessage.remove();
-        addMessage(data.answer, 'assistant', data.sources, data.source_links);
+                loadingMessage.remove();
+                if (streamingMessage) streamingMessage.remove();
+                addMessage(answer, 'assistant', event.sources, event.source_links);
+            } else if (event.type === 'error') {
+                throw new Error(event.detail);
+            }
+        });
 
     } catch (error) {
-        // Replace loading message with error
+        // Replace loading message and any partial answer with error
         loadingMessage.remove();
+        if (streamingMessage) streamingMessage.remove();
         addMessage(`Error: ${error.message}`, 'assistant');
     } finally {
         chatInput.disabled = false;
@@ -111,6 +130,34 @@ async function sendMessage() {
     }
 }
 
+// Parse a server-sent event stream, passing each JSON payload to onEvent
+async function readServerEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const event of events) {
+            if (event.startsWith('data: ')) {
+                onEvent(JSON.parse(event.slice('data: '.length)));
+            }
+        }
+    }
+}
+
+function createStreamingMessage() {
+    const messageDiv = document.createElement('div');
+    messageDiv.className = 'message assistant';
+    messageDiv.innerHTML = '<div class="message-content"></div>';
+    return messageDiv;
+}
+
 function createLoadingMessage() {
     const messageDiv = document.createElement('div');
     messageDiv.className = 'message assistant';
@@ -0,0 +1,17 @@
+#!/bin/bash
+
+# Fast Test Script - LOCAL ITERATION
+# Runs the AIGenerator unit tests across all cores (pytest-xdist, grouped by
+# module/class with --dist=loadscope) without coverage tracing or cache writes.
+# Use this for quick feedback while editing ai_generator.py; run the full
+# suite (optionally with --cov) before pushing.
+#
+# Usage: ./scripts/test-fast.sh [extra pytest args]
+# Prerequisites: uv sync --group dev
+
+echo "⚡ Running fast AIGenerator tests..."
+
+cd "$(dirname "$0")/.."
+
+uv run pytest -n auto --dist=loadscope -p no:cacheprovider \
+    backend/tests/test_ai_generator.py "$@"